@@ -1,14 +1,27 @@
 """Pinterest Authentication."""
 import base64
-
-import requests
+import json
+import threading
+from typing import Any, Hashable, Optional
 
 from singer_sdk.helpers._util import utc_now
-from singer_sdk.authenticators import OAuthAuthenticator, SingletonMeta
+from singer_sdk.authenticators import OAuthAuthenticator
+
+from tap_pinterest_ads.session import get_shared_session
+from tap_pinterest_ads.singleton import KeyedSingletonMeta
+from tap_pinterest_ads.tokencache import TokenCache
+
 
+class PinterestAuthenticator(OAuthAuthenticator, metaclass=KeyedSingletonMeta):
+    """Authenticator class for Pinterest, shared by the streams of a tap with the same config."""
 
-class PinterestAuthenticator(OAuthAuthenticator, metaclass=SingletonMeta):
-    """Authenticator class for Pinterest."""
+    _token_lock = threading.Lock()
+
+    @classmethod
+    def get_instance_key(
+        cls, stream: Any, auth_endpoint: Optional[str] = None, **kwargs: Any
+    ) -> Hashable:
+        return auth_endpoint, json.dumps(dict(stream.config), sort_keys=True, default=str)
 
     @property
     def oauth_request_body(self) -> dict:
@@ -25,7 +38,7 @@ class PinterestAuthenticator(OAuthAuthenticator, metaclass=SingletonMeta):
     def create_for_stream(cls, stream) -> "PinterestAuthenticator":
         return cls(
             stream=stream,
-            auth_endpoint="https://api.pinterest.com/v5/oauth/token",
+            auth_endpoint=stream.url_base + "oauth/token",
             oauth_scopes=",".join([
                 "ads:read",
                 "boards:read",
@@ -36,6 +49,50 @@ class PinterestAuthenticator(OAuthAuthenticator, metaclass=SingletonMeta):
             ])
         )
 
+    @property
+    def auth_headers(self) -> dict:
+        """Return the auth headers, refreshing the access token if needed."""
+        if self.config.get("http_cache_replay") and self.config.get("http_cache_path"):
+            # Replayed runs never reach the API, not even to refresh the token.
+            return {}
+        self.ensure_valid_token()
+        return {"Authorization": f"Bearer {self.access_token}"}
+
+    @property
+    def token_cache(self) -> Optional[TokenCache]:
+        """Return the on-disk token cache, if one is configured."""
+        path = self.config.get("token_cache_path")
+        return TokenCache(path) if path else None
+
+    def ensure_valid_token(self) -> None:
+        """Refresh the access token unless it is still valid.
+
+        Streams may sync on worker threads, so the check and refresh happen
+        under a lock to make sure only one thread refreshes an expired token.
+        With a token cache, a token refreshed by another process is reused.
+        """
+        if self.is_token_valid():
+            return
+        with self._token_lock:
+            if self.is_token_valid():
+                return
+            token_cache = self.token_cache
+            if token_cache is None:
+                self.logger.info("token invalid")
+                self.update_access_token()
+                return
+            key = token_cache.get_key(self.config["client_id"], self.config["refresh_token"])
+            with token_cache.locked():
+                cached = token_cache.get(key)
+                if cached:
+                    self.access_token, self.expires_in = cached
+                    self.last_refreshed = utc_now()
+                    self.logger.info("Reusing cached OAuth access token.")
+                    return
+                self.logger.info("token invalid")
+                self.update_access_token()
+                token_cache.set(key, self.access_token, self.expires_in)
+
     def update_access_token(self) -> None:
         """Update `access_token` along with: `last_refreshed` and `expires_in`.
 
@@ -44,7 +101,7 @@ class PinterestAuthenticator(OAuthAuthenticator, metaclass=SingletonMeta):
         """
         request_time = utc_now()
         auth_request_payload = self.oauth_request_payload
-        token_response = requests.post(
+        token_response = get_shared_session(self.config).post(
             self.auth_endpoint,
             headers={
                 "Content-Type": "application/x-www-form-urlencoded",
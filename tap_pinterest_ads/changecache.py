@@ -0,0 +1,80 @@
+"""On-disk index of record hashes, used to only output changed records."""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from tap_pinterest_ads.singleton import KeyedSingletonMeta
+
+DEFAULT_RETENTION_DAYS = 30
+
+
+class ChangeCache:
+    """SQLite table of a content hash per stream and primary key.
+
+    The hashes of a stream are loaded the first time the stream asks for
+    them. Updates are kept in memory and only written by `commit()`, once the
+    whole sync has succeeded, so records of a failed run are output again.
+    Entries not seen for `retention_days`, e.g. of deleted entities, are
+    evicted on commit.
+    """
+
+    def __init__(self, path: str, retention_days: int = DEFAULT_RETENTION_DAYS) -> None:
+        self.path = os.path.expanduser(path)
+        self.retention_days = retention_days
+        self._digests: Dict[str, Dict[str, bytes]] = {}
+        self._seen: List[Tuple[str, str, bytes]] = []
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._connection = sqlite3.connect(self.path)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS records ("
+            "stream TEXT, key TEXT, digest BLOB, seen REAL, PRIMARY KEY (stream, key)"
+            ") WITHOUT ROWID"
+        )
+
+    @staticmethod
+    def get_digest(record: Mapping[str, Any]) -> bytes:
+        """Return a hash of the record, independent of the order of its keys."""
+        content = json.dumps(record, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.blake2b(content.encode("utf-8"), digest_size=16).digest()
+
+    def is_changed(self, stream: str, key: str, record: Mapping[str, Any]) -> bool:
+        """Return True if the record is new or differs from the last run."""
+        digests = self._digests.get(stream)
+        if digests is None:
+            digests = self._digests[stream] = dict(self._connection.execute(
+                "SELECT key, digest FROM records WHERE stream = ?", (stream,)
+            ))
+        digest = self.get_digest(record)
+        self._seen.append((stream, key, digest))
+        return digests.get(key) != digest
+
+    def commit(self) -> None:
+        """Store the hashes of this run and evict entries not seen for long."""
+        now = time.time()
+        with self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO records (stream, key, digest, seen) VALUES (?, ?, ?, ?)",
+                [(stream, key, digest, now) for stream, key, digest in self._seen],
+            )
+            self._connection.execute(
+                "DELETE FROM records WHERE seen < ?", (now - self.retention_days * 86400,)
+            )
+        self._seen = []
+        self._digests = {}
+
+
+class SharedChangeCache(ChangeCache, metaclass=KeyedSingletonMeta):
+    """Change cache shared by every stream of the tap, one per file and settings."""
+
+
+def get_change_cache(config: Mapping[str, Any]) -> Optional[ChangeCache]:
+    """Return the shared change cache, if one is configured."""
+    if not config.get("change_cache_path"):
+        return None
+    return SharedChangeCache(
+        config["change_cache_path"],
+        config.get("change_cache_retention_days") or DEFAULT_RETENTION_DAYS,
+    )
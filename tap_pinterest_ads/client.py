@@ -1,15 +1,53 @@
 """REST client handling, including PinterestStream base class."""
-from typing import Any, Dict, Optional, Iterable, Callable
+import datetime
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Deque, Dict, FrozenSet, List, NamedTuple, Optional, Iterable, Callable, Tuple
 
 import backoff
 import requests
 
 from memoization import cached
+from singer_sdk.helpers._singer import Catalog
 from singer_sdk.helpers.jsonpath import extract_jsonpath
+from singer_sdk.mapper import SameRecordTransform
 from singer_sdk.streams import RESTStream
 from singer_sdk.exceptions import FatalAPIError, RetriableAPIError
 
 from tap_pinterest_ads.auth import PinterestAuthenticator
+from tap_pinterest_ads.changecache import ChangeCache, get_change_cache
+from tap_pinterest_ads.httpcache import ResponseCache, get_response_cache
+from tap_pinterest_ads.jsonstream import iter_items
+from tap_pinterest_ads.metrics import MetricsCollector
+from tap_pinterest_ads.output import RecordWriter
+from tap_pinterest_ads.ratelimit import RateLimiter, RateLimitError, SharedRateLimiter
+from tap_pinterest_ads.session import get_shared_session
+from tap_pinterest_ads.tokencache import TokenCache
+
+PREFETCH_BUFFER_SIZE = 1000  # Records buffered per prefetched context
+MAX_RATE_LIMIT_RETRIES = 10
+DEFAULT_STATE_FLUSH_INTERVAL = 60  # Seconds between STATE messages for checkpoints
+STREAM_CHUNK_SIZE = 64 * 1024
+_PREFETCH_DONE = object()
+_NOT_DECODED = object()
+
+
+def _freeze(context: dict) -> Tuple:
+    return tuple(sorted((key, str(value)) for key, value in context.items()))
+
+
+class Checkpoint(NamedTuple):
+    """Bookmark passed along with the records fetched for a context.
+
+    Applied to the state once every record before it has been written, also
+    when the records were fetched in another thread.
+    """
+
+    partitions: List[dict]
+    replication_key_value: Any
 
 
 class PinterestStream(RESTStream):
@@ -20,29 +58,478 @@ class PinterestStream(RESTStream):
     records_jsonpath = "$.items[*]"  # Or override `parse_response`.
     next_page_token_jsonpath = "$.bookmark"  # Or override `get_next_page_token`.
 
+    # Config setting holding how many parent contexts to sync per child request.
+    batch_size_setting: Optional[str] = None
+    max_batch_size = 1
+    # Fetch child streams for several records of this stream at the same time.
+    concurrent_children = False
+    # Whether `stream_analytics_responses` applies to this stream.
+    supports_streaming = False
+    # Replication key used when `incremental_entities` is enabled.
+    incremental_replication_key: Optional[str] = None
+    # Only output records that changed since the last run if `change_cache_path` is set.
+    detect_changes = False
+    # Whether `fast_record_output` applies to this stream, whose schema must
+    # only have properties that need no conforming, e.g. numbers and strings.
+    supports_fast_output = False
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._child_batches: Dict[str, List[dict]] = {}
+        self._prefetched: Deque[Tuple[dict, queue.Queue]] = deque()
+        self._pending_child_syncs: Deque[Tuple["PinterestStream", dict]] = deque()
+        self._executor: Optional[Executor] = None
+        self._cancelled = threading.Event()
+        self._state_flushed = time.monotonic()
+        self._completed: Optional[set] = None
+        self._unmapped_properties: set = set()
+        self._set_incremental_replication_key()
+
+    def _set_incremental_replication_key(self) -> None:
+        if self.incremental_replication_key and self.config.get("incremental_entities"):
+            self.replication_key = self.incremental_replication_key
+
+    def apply_catalog(self, catalog: Catalog) -> None:
+        super().apply_catalog(catalog)
+        # Catalogs discovered without `incremental_entities` have no replication key.
+        self._set_incremental_replication_key()
+
+    @property
+    def max_workers(self) -> int:
+        """Return the number of parent contexts to fetch child streams for at once."""
+        if not self.concurrent_children:
+            return 1
+        return max(1, self.config.get("max_workers") or 1)
+
+    @property
+    def pipelined(self) -> bool:
+        """Return True to fetch the records of a context ahead of writing them."""
+        return bool(self.config.get("pipelined_sync"))
+
+    @property
+    def stream_response(self) -> bool:
+        """Return True to parse response bodies incrementally as they download.
+
+        Streamed responses are neither cached nor replayed, so replaying a
+        sync reads every body from the response cache instead.
+        """
+        return (
+            self.supports_streaming
+            and bool(self.config.get("stream_analytics_responses"))
+            and not self.replay_responses
+        )
+
+    @property
+    def batch_size(self) -> int:
+        """Return the number of parent contexts to combine into one sync."""
+        if not self.batch_size_setting:
+            return 1
+        return max(1, min(self.config.get(self.batch_size_setting) or 1, self.max_batch_size))
+
+    def get_parent_statuses(self) -> Optional[FrozenSet[str]]:
+        """Return the statuses of the parent entities this stream syncs, or None for any."""
+        return None
+
+    def get_batch_context(self, contexts: List[dict]) -> Optional[dict]:
+        """Return a single context covering a batch of parent contexts, or None to skip the batch.
+
+        Only called for streams setting `batch_size_setting`, which override
+        this method; other streams are never batched.
+        """
+        return None
+
     @property
     @cached
     def authenticator(self) -> PinterestAuthenticator:
         """Return a new authenticator object."""
         return PinterestAuthenticator.create_for_stream(self)
 
+    @property
+    def requests_session(self) -> requests.Session:
+        """Return the session whose connection pool is shared by all streams."""
+        return get_shared_session(self.config)
+
+    @property
+    def change_cache(self) -> Optional[ChangeCache]:
+        """Return the change cache shared by all streams, if configured."""
+        return get_change_cache(self.config)
+
+    @property
+    def response_cache(self) -> Optional[ResponseCache]:
+        """Return the response cache shared by all streams, if configured."""
+        return get_response_cache(self.config)
+
+    @property
+    def credentials_key(self) -> str:
+        """Return a hash of the login requests are sent with, scoping cached responses."""
+        return TokenCache.get_key(self.config["client_id"], self.config["refresh_token"])
+
+    @property
+    def replay_responses(self) -> bool:
+        """Return True to answer every request from the response cache only."""
+        return bool(self.config.get("http_cache_replay")) and self.response_cache is not None
+
+    def is_immutable_response(self, request: requests.PreparedRequest) -> bool:
+        """Return True if the response to a request can be cached without expiry."""
+        return False
+
+    @property
+    def metrics(self) -> MetricsCollector:
+        """Return the performance metrics collected for all streams."""
+        return MetricsCollector()
+
+    def write_performance_metrics(self) -> None:
+        """Log the performance metrics of the stream, collected over the whole sync."""
+        for metric in self.metrics.get_metrics(self.name):
+            self._write_metric_log(metric, extra_tags=None)
+
+    @property
+    @cached
+    def rate_limiter(self) -> RateLimiter:
+        """Return the rate limiter shared by all streams using the same login."""
+        return SharedRateLimiter(
+            logger=self.logger,
+            requests_per_second=self.config.get("max_requests_per_second"),
+            login=self.credentials_key,
+        )
+
     @property
     def http_headers(self) -> dict:
         """Return the http headers needed."""
-        if not self.authenticator.is_token_valid():
-            self.logger.info("token invalid")
-            self.authenticator.update_access_token()
         headers = {'Accept': 'application/json'}
+        if self.replay_responses:
+            # No token is needed to replay cached responses.
+            return headers
+        self.authenticator.ensure_valid_token()
         headers["Authorization"] = "Bearer {token}".format(token=self.authenticator.access_token)
         return headers
 
+    def _sync_children(self, child_context: dict) -> None:
+        for child_stream in self.child_streams:
+            if not (child_stream.selected or child_stream.has_selected_descendents):
+                continue
+            if child_stream.is_completed(child_context):
+                self.logger.info(f"Skipping {child_stream.name} for {child_context}, completed before the sync was interrupted.")
+                continue
+            if child_stream.batch_size > 1:
+                batch = self._child_batches.setdefault(child_stream.name, [])
+                batch.append(child_context)
+                if len(batch) >= child_stream.batch_size:
+                    self._flush_child_batch(child_stream)
+            elif self.max_workers > 1:
+                if self._executor is None:
+                    self._cancelled.clear()
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix=f"{self.name}-children",
+                    )
+                child_stream.prefetch_records(child_context, self._executor, self._cancelled)
+                self._pending_child_syncs.append((child_stream, child_context))
+            else:
+                child_stream.sync(context=child_context)
+        # Keep up to `max_workers` parent contexts fetching ahead of the output.
+        while len(self._pending_child_syncs) > self.max_workers * len(self.child_streams):
+            self._sync_next_pending_child()
+
+    def _sync_next_pending_child(self) -> None:
+        child_stream, child_context = self._pending_child_syncs.popleft()
+        child_stream.sync(context=child_context)
+
+    def _flush_child_batch(self, child_stream: "PinterestStream") -> None:
+        contexts = self._child_batches.pop(child_stream.name, [])
+        if not contexts:
+            return
+        batch_context = child_stream.get_batch_context(contexts)
+        if batch_context:
+            child_stream.sync(context=batch_context)
+
+    def _flush_children(self) -> None:
+        try:
+            while self._pending_child_syncs:
+                self._sync_next_pending_child()
+        finally:
+            self._shutdown_prefetch()
+        for child_stream in self.child_streams:
+            self._flush_child_batch(child_stream)
+
+    def _shutdown_prefetch(self) -> None:
+        if self._executor is None:
+            return
+        # Unblock any worker still filling a buffer nobody is going to read.
+        self._cancelled.set()
+        self._pending_child_syncs.clear()
+        for child_stream in self.child_streams:
+            child_stream._prefetched.clear()
+        self._executor.shutdown(wait=True)
+        self._executor = None
+
+    def prefetch_records(
+        self, context: dict, executor: Executor, cancelled: threading.Event
+    ) -> None:
+        """Start fetching the records of a context on a worker thread.
+
+        Records are handed back in order, on the calling thread, the next time
+        the stream syncs this context. State and output therefore stay
+        sequential per stream; only the HTTP requests run concurrently.
+        """
+        # Requests read the starting bookmark from state, so write it up front
+        # rather than waiting for `sync()` to get to this context.
+        self._write_starting_replication_value(context)
+        buffer: queue.Queue = queue.Queue(maxsize=PREFETCH_BUFFER_SIZE)
+        self._prefetched.append((context, buffer))
+        executor.submit(self._fill_prefetch_buffer, context, buffer, cancelled)
+
+    def _fill_prefetch_buffer(
+        self, context: dict, buffer: queue.Queue, cancelled: threading.Event
+    ) -> None:
+        def put(item: Any) -> bool:
+            while not cancelled.is_set():
+                try:
+                    buffer.put(item, timeout=1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        try:
+            for record in self.fetch_records(context):
+                if not put(record):
+                    return
+        except Exception as ex:
+            put(ex)
+            return
+        put(_PREFETCH_DONE)
+
+    def _drain_prefetch_buffer(self, buffer: queue.Queue) -> Iterable[Dict[str, Any]]:
+        while True:
+            item = buffer.get()
+            if item is _PREFETCH_DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def _fetch_ahead(self, context: Optional[dict]) -> Iterable[Dict[str, Any]]:
+        """Yield the records of a context, fetching further pages on a thread of its own.
+
+        The next page or date window is requested while the records of the
+        current one are written, up to `PREFETCH_BUFFER_SIZE` records ahead.
+        """
+        buffer: queue.Queue = queue.Queue(maxsize=PREFETCH_BUFFER_SIZE)
+        cancelled = threading.Event()
+        thread = threading.Thread(
+            target=self._fill_prefetch_buffer,
+            args=(context, buffer, cancelled),
+            name=f"{self.name}-fetch",
+            daemon=True,
+        )
+        thread.start()
+        try:
+            yield from self._drain_prefetch_buffer(buffer)
+        finally:
+            cancelled.set()
+            thread.join()
+
+    def fetch_records(self, context: Optional[dict]) -> Iterable[Dict[str, Any]]:
+        """Request and post-process the records of a context.
+
+        Streams with an alternative way of fetching records override this
+        method rather than `get_records`, which may run it on a worker thread.
+        """
+        return self.process_rows(self.request_records(context), context)
+
+    def process_rows(
+        self, rows: Iterable[dict], context: Optional[dict]
+    ) -> Iterable[Dict[str, Any]]:
+        """Post-process rows, leaving out those `post_process` drops."""
+        elapsed = 0.0
+        try:
+            for row in rows:
+                start = time.perf_counter()
+                record = self.post_process(row, context)
+                elapsed += time.perf_counter() - start
+                if record is not None:
+                    yield record
+        finally:
+            self.metrics.add(self.name, "post_process_seconds", elapsed)
+
+    def get_records(self, context: Optional[dict]) -> Iterable[Dict[str, Any]]:
+        """Return a generator of row-type dictionary objects.
+
+        Child syncs still queued for batching or concurrency are completed once
+        the partition is exhausted, so they never span two parent contexts.
+        """
+        if self._prefetched and self._prefetched[0][0] == context:
+            _, buffer = self._prefetched.popleft()
+            records = self._drain_prefetch_buffer(buffer)
+        elif self.pipelined:
+            records = self._fetch_ahead(context)
+        else:
+            records = self.fetch_records(context)
+        if self.incremental_replication_key and self.replication_key:
+            records = self._skip_unchanged(records, context)
+        record_count = 0
+        try:
+            for record in records:
+                if isinstance(record, Checkpoint):
+                    self.write_checkpoint(record)
+                else:
+                    record_count += 1
+                    yield record
+        except BaseException:
+            self._shutdown_prefetch()
+            raise
+        finally:
+            self.metrics.add(self.name, "records", record_count)
+        self._flush_children()
+        if context is not None:
+            self.mark_completed(context)
+
+    def _write_record_message(self, record: dict) -> None:
+        if self.detect_changes and self.change_cache:
+            key = "|".join(str(record.get(k)) for k in self.primary_keys or [])
+            if not self.change_cache.is_changed(self.name, key, record):
+                return
+        if self.fast_output:
+            RecordWriter().write_record(self.name, self.conform_record(record))
+            return
+        super()._write_record_message(record)
+
+    @property
+    @cached
+    def fast_output(self) -> bool:
+        """Return True to write records without the SDK's generic conforming and mapping."""
+        stream_maps = self.stream_maps
+        return (
+            self.supports_fast_output
+            and bool(self.config.get("fast_record_output"))
+            and len(stream_maps) == 1
+            and isinstance(stream_maps[0], SameRecordTransform)
+            and stream_maps[0].stream_alias == self.name
+        )
+
+    @property
+    @cached
+    def record_properties(self) -> FrozenSet[str]:
+        """Return the properties to output, once the catalog has been applied."""
+        return frozenset(
+            name for name in self.schema["properties"]
+            if self.mask.get(("properties", name), True)
+        )
+
+    def conform_record(self, record: dict) -> dict:
+        """Return the record without properties that are deselected or not in the schema."""
+        properties = self.record_properties
+        conformed = {key: value for key, value in record.items() if key in properties}
+        if len(conformed) < len(record):
+            for key in record.keys() - self.schema["properties"].keys() - self._unmapped_properties:
+                self._unmapped_properties.add(key)
+                self.logger.warning(
+                    f"Property '{key}' was present in the '{self.name}' stream but "
+                    "not found in catalog schema. Ignoring."
+                )
+        return conformed
+
+    def _write_schema_message(self) -> None:
+        RecordWriter().flush()
+        super()._write_schema_message()
+
+    def _write_state_message(self) -> None:
+        # The state must not get ahead of records still buffered.
+        RecordWriter().flush()
+        super()._write_state_message()
+
+    def write_checkpoint(self, checkpoint: Checkpoint) -> None:
+        """Advance the bookmarks of the checkpoint's partitions and flush the state."""
+        for partition in checkpoint.partitions:
+            state = self.get_context_state(partition)
+            if checkpoint.replication_key_value > (state.get("replication_key_value") or ""):
+                state["replication_key"] = self.replication_key
+                state["replication_key_value"] = checkpoint.replication_key_value
+        self.flush_state()
+
+    def flush_state(self) -> None:
+        """Emit the state, unless it was emitted less than `state_flush_interval` ago."""
+        interval = self.config.get("state_flush_interval")
+        if interval is None:
+            interval = DEFAULT_STATE_FLUSH_INTERVAL
+        now = time.monotonic()
+        if now - self._state_flushed >= interval:
+            self._write_state_message()
+            self._state_flushed = now
+
+    @property
+    def sync_progress(self) -> dict:
+        """Return the contexts completed by the current sync, kept in the state.
+
+        A sync restarted from the state of an interrupted one skips these
+        contexts. Progress of a sync interrupted on an earlier day is dropped,
+        as that day's data is still to be synced for every context.
+        """
+        today = datetime.datetime.now(datetime.timezone.utc).date().isoformat()
+        progress = self.stream_state.get("sync_progress")
+        if not progress or progress.get("date") != today:
+            progress = self.stream_state["sync_progress"] = {"date": today, "completed": []}
+            self._completed = None
+        return progress
+
+    def get_completion_units(self, context: dict) -> List[dict]:
+        """Return the units of work that syncing a context completes."""
+        return [context]
+
+    def is_completed(self, context: dict) -> bool:
+        """Return True if an interrupted sync already completed the context."""
+        progress = self.sync_progress
+        if self._completed is None:
+            self._completed = {_freeze(unit) for unit in progress["completed"]}
+        return all(_freeze(unit) in self._completed for unit in self.get_completion_units(context))
+
+    def mark_completed(self, context: dict) -> None:
+        """Record that the context was synced, so a restarted sync skips it."""
+        progress = self.sync_progress
+        self.is_completed(context)
+        for unit in self.get_completion_units(context):
+            if _freeze(unit) not in self._completed:
+                self._completed.add(_freeze(unit))
+                progress["completed"].append(unit)
+        self.flush_state()
+
+    def clear_sync_progress(self) -> None:
+        """Forget the completed contexts once the whole sync succeeded."""
+        if self.stream_state.pop("sync_progress", None) is not None:
+            self._completed = None
+            self._write_state_message()
+
+    def _skip_unchanged(
+        self, records: Iterable[Dict[str, Any]], context: Optional[dict]
+    ) -> Iterable[Dict[str, Any]]:
+        """Drop records not updated since the bookmark, still syncing their children.
+
+        The API has no filter on update time, so every record is still listed.
+        Without a bookmark, e.g. on the first run, every record is emitted
+        rather than filtering on `start_date`.
+        """
+        state = self.get_context_state(context)
+        bookmark = None
+        if state.get("replication_key") == self.replication_key:
+            bookmark = state.get("replication_key_value")
+        for record in records:
+            value = record.get(self.replication_key)
+            if bookmark is None or value is None or value >= bookmark:
+                yield record
+            elif self.child_streams:
+                self._sync_children(self.get_child_context(record, context))
+
     def get_next_page_token(
         self, response: requests.Response, previous_token: Optional[Any]
     ) -> Optional[Any]:
         """Return a token for identifying next page or None if no more pages."""
-        if self.next_page_token_jsonpath:
+        if self.next_page_token_jsonpath == "$.bookmark":
+            body = self.response_json(response)
+            next_page_token = body.get("bookmark") if isinstance(body, dict) else None
+        elif self.next_page_token_jsonpath:
             all_matches = extract_jsonpath(
-                self.next_page_token_jsonpath, response.json()
+                self.next_page_token_jsonpath, self.response_json(response)
             )
             first_match = next(iter(all_matches), None)
             next_page_token = first_match
@@ -61,12 +548,102 @@ class PinterestStream(RESTStream):
             params["bookmark"] = next_page_token
         return params
 
+    def response_json(self, response: requests.Response) -> Any:
+        """Return the decoded response body, decoding it only once per response."""
+        body = getattr(response, "_decoded_json", _NOT_DECODED)
+        if body is _NOT_DECODED:
+            body = response.json()
+            response._decoded_json = body  # type: ignore[attr-defined]
+        return body
+
     def parse_response(self, response: requests.Response) -> Iterable[dict]:
         """Parse the response and return an iterator of result rows."""
-        yield from extract_jsonpath(self.records_jsonpath, input=response.json())
+        return self.metrics.timed(self.name, "parse_seconds", self._parse_response(response))
+
+    def _parse_response(self, response: requests.Response) -> Iterable[dict]:
+        if self.stream_response:
+            # Top level arrays only, rows are yielded as soon as they are complete.
+            try:
+                for _, row in iter_items(response.iter_content(chunk_size=STREAM_CHUNK_SIZE)):
+                    yield row
+            finally:
+                response.close()
+            return
+        body = self.response_json(response)
+        # Skip generic JSONPath evaluation for the fixed paths used by the API.
+        if self.records_jsonpath == "$.items[*]" and isinstance(body, dict):
+            yield from body.get("items") or []
+        elif self.records_jsonpath == "$[*]" and isinstance(body, list):
+            yield from body
+        else:
+            yield from extract_jsonpath(self.records_jsonpath, input=body)
+
+    def _request(
+        self, prepared_request: requests.PreparedRequest, context: Optional[dict]
+    ) -> requests.Response:
+        cache = self.response_cache
+        # Report jobs change from one poll to the next, so they opt out of caching.
+        if prepared_request.method != "GET" or not getattr(prepared_request, "cacheable", True):
+            cache = None
+        # Storing a streamed body would read it all into memory before it is parsed.
+        if self.stream_response:
+            cache = None
+        if cache:
+            response = cache.get(
+                prepared_request, self.credentials_key, ignore_expiry=self.replay_responses
+            )
+            if response is not None:
+                self.metrics.add(self.name, "cache_hits", 1)
+                return response
+        if self.replay_responses:
+            raise FatalAPIError(
+                f"No cached response to replay for {prepared_request.method} {prepared_request.url}"
+            )
+        throttled = self.rate_limiter.acquire()
+        start = time.perf_counter()
+        response = self.requests_session.send(
+            prepared_request, timeout=self.timeout, stream=self.stream_response
+        )
+        # Streamed bodies are only read while parsing, so only their announced size is known.
+        if self.stream_response:
+            size = int(response.headers.get("Content-Length") or 0)
+        else:
+            size = len(response.content)
+        self.metrics.observe_request(
+            self.name, self.path, time.perf_counter() - start, response.status_code, size
+        )
+        self.metrics.add(self.name, "throttle_seconds", throttled)
+        self.rate_limiter.update(response)
+        if self._LOG_REQUEST_METRICS:
+            extra_tags = {}
+            if self._LOG_REQUEST_METRIC_URLS:
+                extra_tags["url"] = prepared_request.path_url
+            if self.rate_limiter.remaining is not None:
+                extra_tags["ratelimit_remaining"] = self.rate_limiter.remaining
+            self._write_request_duration_log(
+                endpoint=self.path,
+                response=response,
+                context=context,
+                extra_tags=extra_tags,
+            )
+        self.validate_response(response)
+        if cache:
+            cache.put(
+                prepared_request,
+                self.credentials_key,
+                response,
+                immutable=self.is_immutable_response(prepared_request),
+            )
+        return response
 
     def validate_response(self, response: requests.Response) -> None:
-        if response.status_code == 429 or 500 <= response.status_code < 600:
+        if response.status_code == 429:
+            msg = (
+                f"{response.status_code} Too Many Requests for path: {self.path}"
+                f"\n{response.text}"
+            )
+            raise RateLimitError(msg)
+        elif 500 <= response.status_code < 600:
             msg = (
                 f"{response.status_code} Server Error: "
                 f"{response.reason} for path: {self.path}"
@@ -81,6 +658,10 @@ class PinterestStream(RESTStream):
             )
             raise FatalAPIError(msg)
 
+    def _on_backoff(self, details: dict) -> None:
+        self.metrics.add(self.name, "retries", 1)
+        self.metrics.add(self.name, "backoff_seconds", details["wait"])
+
     def request_decorator(self, func: Callable) -> Callable:
         """Instantiate a decorator for handling request failures.
 
@@ -98,5 +679,15 @@ class PinterestStream(RESTStream):
             (RetriableAPIError,),
             max_tries=5,
             factor=5,
+            on_backoff=self._on_backoff,
         )(func)
+        # The rate limiter already waits for the reset given by the server, so
+        # rate limited requests are retried without any additional backoff.
+        decorator = backoff.on_exception(
+            backoff.constant,
+            (RateLimitError,),
+            interval=0,
+            max_tries=MAX_RATE_LIMIT_RETRIES,
+            on_backoff=self._on_backoff,
+        )(decorator)
         return decorator
\ No newline at end of file
@@ -0,0 +1,114 @@
+"""On-disk index of entity IDs and statuses, as of the last listing of every ad account."""
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from tap_pinterest_ads.singleton import KeyedSingletonMeta
+
+DEFAULT_REFRESH_HOURS = 0
+# Fields of an entity kept in the index, enough to build the context of its children.
+INDEX_FIELDS = ("id", "ad_account_id", "status", "updated_time")
+
+
+class EntityIndex:
+    """SQLite tables of the campaigns, ad groups or ads of each ad account.
+
+    Each entry holds the fields in `INDEX_FIELDS`. The entries of an ad
+    account are used for `refresh_hours` after it was listed, unless listed
+    with a narrower status filter than requested.
+    """
+
+    def __init__(self, path: str, refresh_hours: float = DEFAULT_REFRESH_HOURS) -> None:
+        self.path = os.path.expanduser(path)
+        self.refresh_hours = refresh_hours
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Shared by the worker threads fetching the children of several ad accounts.
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS entities ("
+                "stream TEXT, ad_account_id TEXT, id TEXT, status TEXT, updated_time INTEGER, "
+                "PRIMARY KEY (stream, ad_account_id, id)"
+                ") WITHOUT ROWID"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS listings ("
+                "stream TEXT, ad_account_id TEXT, statuses TEXT, listed REAL, "
+                "PRIMARY KEY (stream, ad_account_id)"
+                ") WITHOUT ROWID"
+            )
+
+    def is_fresh(self, stream: str, ad_account_id: str, statuses: Optional[Tuple[str, ...]]) -> bool:
+        """Return True if the entities of an account were listed recently, with the given statuses."""
+        if not self.refresh_hours:
+            return False
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT statuses, listed FROM listings WHERE stream = ? AND ad_account_id = ?",
+                (stream, ad_account_id),
+            ).fetchone()
+        if row is None:
+            return False
+        listed_statuses, listed = row
+        if listed < time.time() - self.refresh_hours * 3600:
+            return False
+        # An empty filter lists entities of any status.
+        return not listed_statuses or (
+            statuses is not None and set(statuses) <= set(listed_statuses.split(","))
+        )
+
+    def get_entities(
+        self, stream: str, ad_account_id: str, statuses: Optional[Tuple[str, ...]] = None
+    ) -> List[Dict[str, Any]]:
+        """Return the indexed entities of an account, optionally only those of some statuses."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT id, ad_account_id, status, updated_time FROM entities "
+                "WHERE stream = ? AND ad_account_id = ? ORDER BY id",
+                (stream, ad_account_id),
+            ).fetchall()
+        return [
+            dict(zip(INDEX_FIELDS, row)) for row in rows
+            if statuses is None or row[2] in statuses
+        ]
+
+    def replace(
+        self,
+        stream: str,
+        ad_account_id: str,
+        statuses: Optional[Tuple[str, ...]],
+        entities: Iterable[Mapping[str, Any]],
+    ) -> None:
+        """Replace the entities of an account with a new listing, dropping those no longer listed."""
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM entities WHERE stream = ? AND ad_account_id = ?", (stream, ad_account_id)
+            )
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO entities (stream, ad_account_id, id, status, updated_time) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(stream, ad_account_id, entity["id"], entity.get("status"), entity.get("updated_time"))
+                 for entity in entities],
+            )
+            self._connection.execute(
+                "INSERT OR REPLACE INTO listings (stream, ad_account_id, statuses, listed) VALUES (?, ?, ?, ?)",
+                (stream, ad_account_id, ",".join(statuses or ()), time.time()),
+            )
+
+
+class SharedEntityIndex(EntityIndex, metaclass=KeyedSingletonMeta):
+    """Entity index shared by every stream of the tap, one per file and settings."""
+
+
+def get_entity_index(config: Mapping[str, Any]) -> Optional[EntityIndex]:
+    """Return the shared entity index, if one is configured."""
+    if not config.get("entity_index_path"):
+        return None
+    refresh_hours = config.get("entity_index_refresh_hours")
+    return SharedEntityIndex(
+        config["entity_index_path"],
+        DEFAULT_REFRESH_HOURS if refresh_hours is None else refresh_hours,
+    )
@@ -0,0 +1,114 @@
+"""On-disk cache of API responses, used to re-run syncs without spending quota."""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Mapping, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from tap_pinterest_ads.singleton import KeyedSingletonMeta
+
+DEFAULT_TTL_SECONDS = 3600
+
+
+class ResponseCache:
+    """SQLite table of successful responses keyed by login, method and normalized URL.
+
+    Responses expire `ttl_seconds` after they were stored, unless they were
+    stored as immutable, e.g. analytics of days that can no longer change.
+    Responses are written as soon as they are received, so a failed run can
+    be re-run from where it stopped without requesting the same pages again.
+    Logins sharing a cache file never see each other's responses, as every
+    key starts with a hash of the credentials the request was sent with.
+    """
+
+    def __init__(self, path: str, ttl_seconds: int = DEFAULT_TTL_SECONDS) -> None:
+        self.path = os.path.expanduser(path)
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Shared by the worker threads fetching child streams and date windows.
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, status INTEGER, headers TEXT, body BLOB, expires REAL"
+                ") WITHOUT ROWID"
+            )
+
+    @staticmethod
+    def get_key(request: requests.PreparedRequest, credentials: str) -> str:
+        """Return the credentials hash, method and URL of a request, with its parameters sorted."""
+        url = urlsplit(request.url)
+        query = urlencode(sorted(parse_qsl(url.query, keep_blank_values=True)))
+        return f"{credentials} {request.method} {urlunsplit(url._replace(query=query, fragment=''))}"
+
+    def get(
+        self, request: requests.PreparedRequest, credentials: str, ignore_expiry: bool = False
+    ) -> Optional[requests.Response]:
+        """Return the cached response to a request sent with some credentials, or None if none is fresh."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT status, headers, body, expires FROM responses WHERE key = ?",
+                (self.get_key(request, credentials),),
+            ).fetchone()
+        if row is None:
+            return None
+        status, headers, body, expires = row
+        if not ignore_expiry and expires is not None and expires < time.time():
+            return None
+        response = requests.Response()
+        response.status_code = status
+        response.reason = "OK"
+        response.headers = CaseInsensitiveDict(json.loads(headers))
+        response.url = request.url
+        response.request = request
+        response.encoding = "utf-8"
+        response._content = body
+        response._content_consumed = True
+        return response
+
+    def put(
+        self,
+        request: requests.PreparedRequest,
+        credentials: str,
+        response: requests.Response,
+        immutable: bool = False,
+    ) -> None:
+        """Store a response, reading its body if it was streamed."""
+        expires = None if immutable else time.time() + self.ttl_seconds
+        headers = {
+            name: value for name, value in response.headers.items()
+            if name.lower() not in ("content-encoding", "transfer-encoding", "set-cookie")
+        }
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, status, headers, body, expires) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (self.get_key(request, credentials), response.status_code, json.dumps(headers),
+                 response.content, expires),
+            )
+
+    def evict_expired(self) -> None:
+        """Delete responses that expired, keeping immutable ones."""
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM responses WHERE expires < ?", (time.time(),))
+
+
+class SharedResponseCache(ResponseCache, metaclass=KeyedSingletonMeta):
+    """Response cache shared by every stream of the tap, one per file and settings."""
+
+
+def get_response_cache(config: Mapping[str, Any]) -> Optional[ResponseCache]:
+    """Return the shared response cache, if one is configured."""
+    if not config.get("http_cache_path"):
+        return None
+    ttl_seconds = config.get("http_cache_ttl_seconds")
+    return SharedResponseCache(
+        config["http_cache_path"],
+        DEFAULT_TTL_SECONDS if ttl_seconds is None else ttl_seconds,
+    )
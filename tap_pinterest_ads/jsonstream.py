@@ -0,0 +1,116 @@
+"""Incremental parsing of large JSON documents."""
+import codecs
+import json
+from typing import Any, Iterable, Iterator, Optional, Tuple, Union
+
+_WHITESPACE = " \t\n\r"
+_decoder = json.JSONDecoder()
+
+
+class _ChunkReader:
+    """Read JSON values one at a time from an iterable of text or byte chunks."""
+
+    def __init__(self, chunks: Iterable[Union[bytes, str]]) -> None:
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        """Append the next chunk to the buffer, return False at end of input."""
+        while not self._eof:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self._eof = True
+                text = self._utf8.decode(b"", final=True)
+            elif isinstance(chunk, bytes):
+                text = self._utf8.decode(chunk)
+            else:
+                text = chunk
+            if text:
+                self._buffer = self._buffer[self._pos:] + text
+                self._pos = 0
+                return True
+        return False
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character, or '' at end of input."""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        """Consume `char`, which must be the next non-whitespace character."""
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected '{char}' in JSON document, found '{found}'.")
+        self._pos += 1
+
+    def value(self) -> Any:
+        """Decode and consume the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number at the end of the buffer may continue in the next chunk.
+            if end == len(self._buffer) and not self._eof and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def separator(self, closing: str) -> bool:
+        """Consume a ',' or the `closing` bracket, return True if more items follow."""
+        char = self.peek()
+        if char == ",":
+            self._pos += 1
+            return True
+        self.expect(closing)
+        return False
+
+
+def _iter_array(reader: _ChunkReader) -> Iterator[Any]:
+    reader.expect("[")
+    if reader.peek() == "]":
+        reader.expect("]")
+        return
+    while True:
+        yield reader.value()
+        if not reader.separator("]"):
+            return
+
+
+def iter_items(chunks: Iterable[Union[bytes, str]]) -> Iterator[Tuple[Optional[str], Any]]:
+    """Yield the items of a JSON document without loading all of it at once.
+
+    A top level array yields `(None, item)` for each element. A top level
+    object yields `(key, item)` for each element of array values, and
+    `(key, value)` for any other value.
+    """
+    reader = _ChunkReader(chunks)
+    if reader.peek() == "[":
+        for item in _iter_array(reader):
+            yield None, item
+        return
+    reader.expect("{")
+    if reader.peek() == "}":
+        reader.expect("}")
+        return
+    while True:
+        key = reader.value()
+        reader.expect(":")
+        if reader.peek() == "[":
+            for item in _iter_array(reader):
+                yield key, item
+        else:
+            yield key, reader.value()
+        if not reader.separator("}"):
+            return
@@ -0,0 +1,174 @@
+"""Performance metrics collected per stream over a whole sync."""
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Iterator, List, TypeVar
+
+from singer_sdk.authenticators import SingletonMeta
+
+# Upper bounds in seconds of the request latency histogram buckets.
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, float("inf"))
+
+T = TypeVar("T")
+
+
+class StreamMetrics:
+    """Counters and timers of a single stream."""
+
+    def __init__(self) -> None:
+        self.latency_buckets = [0] * len(LATENCY_BUCKETS)
+        self.latency_sum = 0.0
+        self.requests = 0
+        self.bytes_received = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.cache_hits = 0
+        self.backoff_seconds = 0.0
+        self.throttle_seconds = 0.0
+        self.parse_seconds = 0.0
+        self.post_process_seconds = 0.0
+        self.records = 0
+
+
+class MetricsCollector(metaclass=SingletonMeta):
+    """Collects the metrics of all streams, including those synced on worker threads."""
+
+    def __init__(self) -> None:
+        self.started = time.monotonic()
+        self._streams: Dict[str, StreamMetrics] = defaultdict(StreamMetrics)
+        self._endpoints: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        # Labels added to every Prometheus metric, e.g. the login of a shard.
+        self.labels: Dict[str, str] = {}
+
+    def observe_request(self, stream: str, endpoint: str, seconds: float, status_code: int, size: int) -> None:
+        """Record the latency and size of a response."""
+        with self._lock:
+            metrics = self._streams[stream]
+            self._endpoints[stream] = endpoint
+            metrics.requests += 1
+            metrics.latency_sum += seconds
+            metrics.bytes_received += size
+            if status_code == 429:
+                metrics.rate_limited += 1
+            for n, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    metrics.latency_buckets[n] += 1
+                    break
+
+    def add(self, stream: str, name: str, value: float) -> None:
+        """Add to a counter or timer of a stream, e.g. `retries` or `parse_seconds`."""
+        with self._lock:
+            metrics = self._streams[stream]
+            setattr(metrics, name, getattr(metrics, name) + value)
+
+    def timed(self, stream: str, name: str, items: Iterable[T]) -> Iterator[T]:
+        """Yield from `items`, adding the time spent producing them to a timer."""
+        iterator = iter(items)
+        elapsed = 0.0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    elapsed += time.perf_counter() - start
+                yield item
+        finally:
+            self.add(stream, name, elapsed)
+
+    def get_metrics(self, stream: str) -> List[Dict[str, Any]]:
+        """Return the metrics of a stream in the format of Singer metric logs."""
+        with self._lock:
+            if stream not in self._streams:
+                return []
+            metrics = self._streams[stream]
+            tags = {"stream": stream, "endpoint": self._endpoints.get(stream)}
+            run_seconds = time.monotonic() - self.started
+            counters = {
+                "http_request_count": metrics.requests,
+                "http_response_bytes": metrics.bytes_received,
+                "http_retry_count": metrics.retries,
+                "http_rate_limited_count": metrics.rate_limited,
+                "http_cache_hit_count": metrics.cache_hits,
+            }
+            timers = {
+                "http_request_duration": metrics.latency_sum,
+                "backoff_duration": metrics.backoff_seconds,
+                "throttle_duration": metrics.throttle_seconds,
+                "parse_response_duration": metrics.parse_seconds,
+                "post_process_duration": metrics.post_process_seconds,
+            }
+            histogram = {
+                "type": "histogram",
+                "metric": "http_request_duration_histogram",
+                "value": {
+                    str(bound): count
+                    for bound, count in zip(LATENCY_BUCKETS, metrics.latency_buckets)
+                },
+                "tags": tags,
+            }
+            records_per_second = metrics.records / run_seconds if run_seconds else 0.0
+        return [
+            *({"type": "counter", "metric": name, "value": value, "tags": dict(tags)}
+              for name, value in counters.items()),
+            *({"type": "timer", "metric": name, "value": round(value, 6), "tags": dict(tags)}
+              for name, value in timers.items()),
+            histogram,
+            {
+                "type": "gauge",
+                "metric": "records_per_second",
+                "value": round(records_per_second, 3),
+                "tags": dict(tags),
+            },
+        ]
+
+    def to_prometheus(self) -> str:
+        """Return all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            streams = dict(self._streams)
+        extra = "".join(f',{name}="{value}"' for name, value in sorted(self.labels.items()))
+        for name, kind, attribute in (
+            ("tap_pinterest_http_requests_total", "counter", "requests"),
+            ("tap_pinterest_http_response_bytes_total", "counter", "bytes_received"),
+            ("tap_pinterest_http_retries_total", "counter", "retries"),
+            ("tap_pinterest_http_rate_limited_total", "counter", "rate_limited"),
+            ("tap_pinterest_http_cache_hits_total", "counter", "cache_hits"),
+            ("tap_pinterest_backoff_seconds_total", "counter", "backoff_seconds"),
+            ("tap_pinterest_throttle_seconds_total", "counter", "throttle_seconds"),
+            ("tap_pinterest_parse_response_seconds_total", "counter", "parse_seconds"),
+            ("tap_pinterest_post_process_seconds_total", "counter", "post_process_seconds"),
+            ("tap_pinterest_records_total", "counter", "records"),
+        ):
+            lines.append(f"# TYPE {name} {kind}")
+            for stream, metrics in sorted(streams.items()):
+                lines.append(f'{name}{{stream="{stream}"{extra}}} {getattr(metrics, attribute)}')
+        name = "tap_pinterest_http_request_duration_seconds"
+        lines.append(f"# TYPE {name} histogram")
+        for stream, metrics in sorted(streams.items()):
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, metrics.latency_buckets):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else str(bound)
+                lines.append(f'{name}_bucket{{stream="{stream}"{extra},le="{le}"}} {cumulative}')
+            lines.append(f'{name}_sum{{stream="{stream}"{extra}}} {metrics.latency_sum}')
+            lines.append(f'{name}_count{{stream="{stream}"{extra}}} {metrics.requests}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> None:
+        """Write all metrics to a Prometheus textfile, replacing it atomically."""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".metrics-")
+        try:
+            with os.fdopen(fd, "w") as tmp_file:
+                tmp_file.write(self.to_prometheus())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
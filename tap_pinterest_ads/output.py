@@ -0,0 +1,155 @@
+"""Buffered output of Singer messages, bypassing the SDK's per-record overhead."""
+import datetime
+import io
+import json
+import queue
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, TextIO
+
+from singer import utils as singer_utils
+from singer_sdk.authenticators import SingletonMeta
+
+try:
+    import orjson
+except ImportError:  # Optional, see the `fast` extra
+    orjson = None  # type: ignore
+
+OUTPUT_BUFFER_SIZE = 256 * 1024  # Bytes of messages written to stdout at once
+OUTPUT_QUEUE_SIZE = 16  # Chunks of messages waiting for the writer thread
+
+
+def _dumps_json(message: Dict[str, Any]) -> str:
+    return json.dumps(message, default=str)
+
+
+def _dumps_orjson(message: Dict[str, Any]) -> str:
+    try:
+        return orjson.dumps(message).decode("utf-8")
+    except TypeError:
+        # E.g. integers beyond 64 bits.
+        return _dumps_json(message)
+
+
+def get_encoder() -> Callable[[Dict[str, Any]], str]:
+    """Return the fastest JSON encoder available."""
+    return _dumps_orjson if orjson is not None else _dumps_json
+
+
+class RecordWriter(metaclass=SingletonMeta):
+    """Writes RECORD messages of all streams to stdout in large chunks.
+
+    Records are only buffered in between other messages: streams flush the
+    buffer before writing a SCHEMA or STATE message, so a state never gets
+    ahead of the records it covers.
+    """
+
+    def __init__(self) -> None:
+        self.dumps = get_encoder()
+        self._buffer: List[str] = []
+        self._size = 0
+        self._second = None
+        self._time_extracted = ""
+
+    @property
+    def time_extracted(self) -> str:
+        """Return the current time as formatted by Singer, reformatted once per second."""
+        second = int(time.time())
+        if second != self._second:
+            self._second = second
+            self._time_extracted = singer_utils.strftime(
+                datetime.datetime.now(datetime.timezone.utc)
+            )
+        return self._time_extracted
+
+    def write_record(self, stream: str, record: Dict[str, Any]) -> None:
+        """Buffer a RECORD message."""
+        line = self.dumps({
+            "type": "RECORD",
+            "stream": stream,
+            "record": record,
+            "time_extracted": self.time_extracted,
+        })
+        self._buffer.append(line)
+        self._size += len(line)
+        if self._size >= OUTPUT_BUFFER_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered messages to stdout."""
+        if not self._buffer:
+            return
+        self._buffer.append("")
+        sys.stdout.write("\n".join(self._buffer))
+        sys.stdout.flush()
+        self._buffer = []
+        self._size = 0
+
+
+class PipelinedOutput(io.TextIOBase):
+    """Stdout replacement handing messages to a dedicated writer thread.
+
+    Messages are collected into chunks and passed through a bounded queue, so
+    a target that is slow to read only blocks the sync once the queue is full.
+    All messages share the one queue, so they are written in the order the
+    tap wrote them: a STATE always follows the records it covers.
+    """
+
+    def __init__(self, stream: TextIO) -> None:
+        self.stream = stream
+        self._chunks: queue.Queue = queue.Queue(maxsize=OUTPUT_QUEUE_SIZE)
+        self._buffer: List[str] = []
+        self._size = 0
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._write_chunks, name="output-writer", daemon=True)
+        self._thread.start()
+
+    def _write_chunks(self) -> None:
+        while True:
+            chunk = self._chunks.get()
+            if chunk is None:
+                return
+            if self._error is not None:
+                # Keep draining so the sync fails on its next write, not blocks.
+                continue
+            try:
+                self.stream.write(chunk)
+                self.stream.flush()
+            except BaseException as ex:
+                self._error = ex
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def write(self, text: str) -> int:
+        self._raise_error()
+        self._buffer.append(text)
+        self._size += len(text)
+        if self._size >= OUTPUT_BUFFER_SIZE:
+            self.send()
+        return len(text)
+
+    def flush(self) -> None:
+        # Singer flushes after every message, chunks are sent once large enough.
+        pass
+
+    def send(self) -> None:
+        """Queue the buffered messages for the writer thread."""
+        if self._buffer:
+            self._chunks.put("".join(self._buffer))
+            self._buffer = []
+            self._size = 0
+
+    def close(self) -> None:
+        """Write every message still buffered or queued, then stop the writer thread."""
+        if self.closed:
+            return
+        try:
+            self.send()
+            self._chunks.put(None)
+            self._thread.join()
+            self._raise_error()
+        finally:
+            super().close()
@@ -0,0 +1,129 @@
+"""Request pacing driven by Pinterest's rate limit headers."""
+import email.utils
+import re
+import threading
+import time
+from typing import Any, Hashable, Optional
+
+import requests
+
+from tap_pinterest_ads.singleton import KeyedSingletonMeta
+
+DEFAULT_RETRY_AFTER = 60  # Seconds to wait on a 429 without any reset hint
+_NUMBER = re.compile(r"\d+(\.\d+)?")
+
+
+class RateLimitError(Exception):
+    """The API rejected a request for exceeding the rate limit.
+
+    Kept apart from `RetriableAPIError` as it is retried on the schedule of
+    the rate limiter rather than with exponential backoff.
+    """
+
+
+def _header_number(response: requests.Response, name: str) -> Optional[float]:
+    """Return the first number in a header, e.g. `100` in `100, 100;w=60`."""
+    value = response.headers.get(name)
+    match = _NUMBER.search(value) if value else None
+    return float(match.group()) if match else None
+
+
+def get_retry_after(response: requests.Response) -> Optional[float]:
+    """Return the seconds to wait before retrying, as given by the server."""
+    value = response.headers.get("Retry-After")
+    if value:
+        if value.strip().isdigit():
+            return float(value)
+        retry_at = email.utils.parsedate_to_datetime(value)
+        if retry_at is not None:
+            return max(0.0, retry_at.timestamp() - time.time())
+    reset = _header_number(response, "X-RateLimit-Reset")
+    if reset is not None and reset > 1e9:
+        # Some endpoints send the reset as an epoch timestamp.
+        reset = max(0.0, reset - time.time())
+    return reset
+
+
+class RateLimiter:
+    """Token bucket pacing the requests of every stream and worker thread.
+
+    The refill rate follows the `X-RateLimit-Remaining` budget spread over the
+    time left until `X-RateLimit-Reset`, so requests are paced to stay under
+    quota, but never exceeds `requests_per_second` if set. A 429 response
+    blocks all requests until the server-given reset.
+    """
+
+    def __init__(self, logger, requests_per_second: Optional[float] = None) -> None:
+        self.logger = logger
+        self.max_rate = requests_per_second
+        self.rate = requests_per_second
+        self.capacity = max(1.0, requests_per_second or 1.0)
+        self.tokens = self.capacity
+        self.limit: Optional[float] = None
+        self.remaining: Optional[float] = None
+        self.blocked_until = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        if self.rate:
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        else:
+            self.tokens = self.capacity
+        self._updated = now
+
+    def acquire(self) -> float:
+        """Block until a request may be sent, returning the seconds waited."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            # Reserve a token even if it is not available yet, so concurrent
+            # callers queue up behind each other instead of all waking at once.
+            self.tokens -= 1
+            delay = max(0.0, self.blocked_until - now)
+            if self.tokens < 0 and self.rate:
+                delay = max(delay, -self.tokens / self.rate)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def update(self, response: requests.Response) -> None:
+        """Adjust the pacing to the rate limit headers of a response."""
+        limit = _header_number(response, "X-RateLimit-Limit")
+        remaining = _header_number(response, "X-RateLimit-Remaining")
+        reset = get_retry_after(response)
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if limit is not None:
+                self.limit = limit
+            if remaining is not None:
+                self.remaining = remaining
+                self.tokens = min(self.tokens, remaining)
+                if reset:
+                    self.rate = max(remaining, 1.0) / reset
+                    if self.max_rate:
+                        self.rate = min(self.max_rate, self.rate)
+            if response.status_code == 429:
+                wait = reset if reset is not None else DEFAULT_RETRY_AFTER
+                self.blocked_until = max(self.blocked_until, now + wait)
+                self.tokens = min(self.tokens, 0.0)
+                self.logger.warning(
+                    f"Rate limited by the API, pausing all requests for {wait:.0f}s "
+                    f"({self.remaining} of {self.limit} requests remaining)."
+                )
+
+
+class SharedRateLimiter(RateLimiter, metaclass=KeyedSingletonMeta):
+    """Rate limiter shared by every stream of the tap sending requests with the same login."""
+
+    def __init__(self, logger, requests_per_second: Optional[float] = None, login: str = "") -> None:
+        super().__init__(logger, requests_per_second)
+        self.login = login
+
+    @classmethod
+    def get_instance_key(
+        cls, logger: Any, requests_per_second: Optional[float] = None, login: str = ""
+    ) -> Hashable:
+        # The API budgets requests per login, the logger is that of the first stream.
+        return login, requests_per_second
@@ -0,0 +1,140 @@
+"""Asynchronous analytics reports for Pinterest ad accounts.
+
+Instead of calling the synchronous analytics endpoints once per entity and
+date window, a report job is created for a whole ad account and date range,
+polled until it is finished, and the resulting file is downloaded and parsed
+as it streams in.
+"""
+import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import backoff
+import requests
+
+from singer_sdk.exceptions import FatalAPIError
+
+from tap_pinterest_ads.jsonstream import iter_items
+
+REPORT_WINDOW_DAYS = 186  # Maximum date range of a single report
+REPORT_TIMEOUT = 3600  # Seconds to wait for a report before giving up
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+PENDING_REPORT_STATUSES = ("IN_PROGRESS",)
+
+
+def iter_date_windows(
+    start_date: datetime.date, end_date: datetime.date, days: int = REPORT_WINDOW_DAYS
+) -> Iterable[Tuple[datetime.date, datetime.date]]:
+    """Split the inclusive range from `start_date` to `end_date` into windows."""
+    while start_date <= end_date:
+        window_end = min(start_date + datetime.timedelta(days=days - 1), end_date)
+        yield start_date, window_end
+        start_date = window_end + datetime.timedelta(days=1)
+
+
+class AnalyticsReport:
+    """A single report job for one ad account and date range."""
+
+    def __init__(
+        self,
+        stream: Any,
+        context: dict,
+        level: str,
+        columns: List[str],
+        start_date: datetime.date,
+        end_date: datetime.date,
+    ) -> None:
+        self.stream = stream
+        self.context = context
+        self.level = level
+        self.columns = columns
+        self.start_date = start_date
+        self.end_date = end_date
+        self.url = "".join([stream.url_base, "ad_accounts/{ad_account_id}/reports"]).format(
+            ad_account_id=context["ad_account_id"]
+        )
+
+    def _send(
+        self, method: str, params: Optional[dict] = None, json: Optional[dict] = None
+    ) -> requests.Response:
+        stream = self.stream
+        prepared_request = stream.requests_session.prepare_request(
+            requests.Request(
+                method=method,
+                url=self.url,
+                params=params,
+                headers=stream.http_headers,
+                json=json,
+            )
+        )
+        prepared_request.cacheable = False
+        decorated_request = stream.request_decorator(stream._request)
+        return decorated_request(prepared_request, self.context)
+
+    def create(self) -> str:
+        """Submit the report job and return its token."""
+        response = self._send("POST", json={
+            "start_date": self.start_date.strftime("%Y-%m-%d"),
+            "end_date": self.end_date.strftime("%Y-%m-%d"),
+            "granularity": "DAY",
+            "columns": self.columns,
+            "level": self.level,
+            "report_format": "JSON",
+        })
+        return response.json()["token"]
+
+    def get_status(self, token: str) -> dict:
+        """Return the status of the report job."""
+        return self._send("GET", params={"token": token}).json()
+
+    def wait(self, token: str) -> str:
+        """Poll the report job until it is finished and return its download URL.
+
+        Raises:
+            FatalAPIError: When the report fails or does not finish in time.
+        """
+        poll = backoff.on_predicate(
+            backoff.expo,
+            lambda status: status.get("report_status") in PENDING_REPORT_STATUSES,
+            factor=2,
+            max_value=60,
+            max_time=REPORT_TIMEOUT,
+        )(self.get_status)
+        status = poll(token)
+        if status.get("report_status") != "FINISHED":
+            raise FatalAPIError(
+                f"Report for ad account {self.context['ad_account_id']} "
+                f"from {self.start_date} to {self.end_date} did not finish: {status}"
+            )
+        return status["url"]
+
+    def download(self, url: str) -> Iterable[Tuple[Optional[str], dict]]:
+        """Stream the report file, yielding `(entity_id, row)` pairs."""
+        with self.stream.requests_session.get(
+            url, stream=True, timeout=self.stream.timeout
+        ) as response:
+            response.raise_for_status()
+            yield from iter_items(response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE))
+
+    def rows(self) -> Iterable[Tuple[Optional[str], dict]]:
+        """Run the report job and yield its rows."""
+        token = self.create()
+        self.stream.logger.info(
+            f"Submitted {self.level} report for ad account {self.context['ad_account_id']} "
+            f"from {self.start_date} to {self.end_date}."
+        )
+        yield from self.download(self.wait(token))
+
+
+def get_report_records(
+    stream: Any,
+    context: dict,
+    level: str,
+    columns: List[str],
+    start_date: datetime.date,
+    end_date: datetime.date,
+) -> Iterable[Tuple[Optional[str], Dict[str, Any]]]:
+    """Yield `(entity_id, row)` pairs of reports covering the given date range."""
+    for window_start, window_end in iter_date_windows(start_date, end_date):
+        report = AnalyticsReport(stream, context, level, columns, window_start, window_end)
+        yield from report.rows()
@@ -0,0 +1,65 @@
+"""HTTP session shared by the authenticator and all streams."""
+import socket
+from typing import Any, Mapping
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+from tap_pinterest_ads.singleton import KeyedSingletonMeta
+
+DEFAULT_POOL_SIZE = 10
+# Streams synced at once along a chain of parents, e.g. ad accounts, ads and ad analytics.
+STREAM_DEPTH = 3
+
+
+class KeepAliveAdapter(HTTPAdapter):
+    """HTTP adapter enabling TCP keep-alive on pooled connections.
+
+    Keeps idle connections, e.g. while waiting out a rate limit, from being
+    dropped by intermediaries so they can be reused without a new handshake.
+    """
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        kwargs["socket_options"] = HTTPConnection.default_socket_options + [
+            (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+        ]
+        super().init_poolmanager(*args, **kwargs)
+
+
+class SharedSession(requests.Session, metaclass=KeyedSingletonMeta):
+    """Session with a single connection pool reused for every request.
+
+    One session is shared per pool size and keep-alive setting, so a tap
+    configured for more workers than an earlier one gets a larger pool.
+    """
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE, keep_alive: bool = True) -> None:
+        super().__init__()
+        adapter_class = KeepAliveAdapter if keep_alive else HTTPAdapter
+        # One pool per host: the API, the OAuth endpoint and report downloads.
+        adapter = adapter_class(pool_connections=4, pool_maxsize=pool_size)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+        if not keep_alive:
+            self.headers["Connection"] = "close"
+
+
+def get_pool_size(config: Mapping[str, Any]) -> int:
+    """Return the number of connections needed by the threads of the tap that send requests."""
+    # Each worker thread may fetch several date windows of an analytics context at once.
+    pool_size = (config.get("max_workers") or 1) * (config.get("analytics_window_workers") or 1)
+    if config.get("pipelined_sync"):
+        # Each stream being synced fetches ahead on a thread of its own; the
+        # output writer thread sends no requests.
+        pool_size += STREAM_DEPTH
+    # The main thread, also requesting OAuth tokens.
+    pool_size += 1
+    return max(config.get("http_pool_size") or DEFAULT_POOL_SIZE, pool_size)
+
+
+def get_shared_session(config: Mapping[str, Any]) -> requests.Session:
+    """Return the shared session, sized for the concurrency of the tap."""
+    return SharedSession(
+        pool_size=get_pool_size(config), keep_alive=config.get("http_keep_alive", True)
+    )
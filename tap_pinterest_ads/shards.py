@@ -0,0 +1,213 @@
+"""Sync of many Pinterest logins at once, one worker process per login.
+
+Every entry of the `credentials` config is a shard, synced by a tap of its
+own in a worker process. Workers send their Singer messages to the main
+process, which merges them into a single stream: schemas are written once,
+records as they arrive, and the state keeps the state of every shard under
+its name.
+"""
+import io
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import traceback
+from typing import Any, Dict, List, Mapping, Optional, TextIO, Tuple, Type
+
+from singer_sdk.exceptions import ConfigValidationError
+
+from tap_pinterest_ads.metrics import MetricsCollector
+
+SHARD_CHUNK_SIZE = 64 * 1024  # Bytes of messages sent to the main process at once
+# Starts of RECORD messages, as encoded by Singer or by `fast_record_output`.
+RECORD_PREFIXES = ('{"type": "RECORD"', '{"type":"RECORD"')
+# Config settings of the main process that do not apply to a single shard.
+SHARD_ONLY_SETTINGS = ("credentials", "shard_workers")
+# Files written by a single tap, named after each shard so that workers never share them.
+# The token cache is locked for concurrent runs and stays shared.
+SHARD_FILE_SETTINGS = (
+    "prometheus_textfile_path",
+    "change_cache_path",
+    "http_cache_path",
+    "entity_index_path",
+)
+
+
+class Shard:
+    """A single login, or a subset of its ad accounts, with its config and state."""
+
+    def __init__(self, name: str, config: Dict[str, Any], state: dict) -> None:
+        self.name = name
+        self.config = config
+        self.state = state
+
+
+def get_shards(config: Mapping[str, Any], state: Mapping[str, Any]) -> List[Shard]:
+    """Return a shard per entry of `credentials`.
+
+    Entries default to the app and settings of the top-level config, with
+    the files in `SHARD_FILE_SETTINGS` named after the shard. The state of
+    each shard is kept under its name, or its client ID if unnamed.
+
+    Raises:
+        ConfigValidationError: When two entries share the same name.
+    """
+    shards = []
+    for entry in config["credentials"]:
+        name = entry.get("name") or entry.get("client_id") or config["client_id"]
+        if any(shard.name == name for shard in shards):
+            raise ConfigValidationError(
+                f"Credentials '{name}' are listed twice, give each entry a distinct `name`."
+            )
+        shard_config = {
+            key: value for key, value in config.items() if key not in SHARD_ONLY_SETTINGS
+        }
+        shard_config.update({key: value for key, value in entry.items() if key != "name"})
+        for setting in SHARD_FILE_SETTINGS:
+            if shard_config.get(setting):
+                root, ext = os.path.splitext(shard_config[setting])
+                shard_config[setting] = f"{root}.{name}{ext}"
+        shard_state = state.get("tenants", {}).get(name, {})
+        shards.append(Shard(name, shard_config, shard_state))
+    return shards
+
+
+class ShardOutput(io.TextIOBase):
+    """Stdout of a worker, sending its messages to the main process in chunks."""
+
+    def __init__(self, name: str, messages: multiprocessing.Queue) -> None:
+        self.name = name
+        self.messages = messages
+        self._buffer: List[str] = []
+        self._size = 0
+
+    def write(self, text: str) -> int:
+        self._buffer.append(text)
+        self._size += len(text)
+        if self._size >= SHARD_CHUNK_SIZE:
+            self.send()
+        return len(text)
+
+    def flush(self) -> None:
+        # Singer flushes after every message, chunks are sent once large enough.
+        pass
+
+    def send(self) -> None:
+        """Send the buffered messages to the main process."""
+        if self._buffer:
+            self.messages.put((self.name, "messages", "".join(self._buffer)))
+            self._buffer = []
+            self._size = 0
+
+
+def run_shard(
+    tap_class: Type, shard: Shard, catalog: Optional[dict], messages: multiprocessing.Queue
+) -> None:
+    """Sync a shard in a worker process, reporting its end, or error, last."""
+    output = ShardOutput(shard.name, messages)
+    error = None
+    try:
+        MetricsCollector().labels = {"tenant": shard.name}
+        tap = tap_class(config=shard.config, catalog=catalog, state=shard.state)
+        sys.stdout = output
+        tap.sync_all()
+    except BaseException:
+        error = traceback.format_exc()
+    finally:
+        sys.stdout = sys.__stdout__
+        output.send()
+        messages.put((shard.name, "done" if error is None else "error", error))
+        messages.close()
+        messages.join_thread()
+
+
+class ShardMerger:
+    """Merge the messages of all shards into a single Singer stream."""
+
+    def __init__(self, state: Mapping[str, Any], output: TextIO) -> None:
+        self.state = {"tenants": dict(state.get("tenants", {}))}
+        self.output = output
+        self._schemas = set()
+
+    def write(self, name: str, text: str) -> None:
+        """Write the messages of a shard, returned as a chunk of lines."""
+        lines = []
+        for line in text.splitlines():
+            # Records are forwarded as they are, without decoding them.
+            if line.startswith(RECORD_PREFIXES):
+                lines.append(line)
+                continue
+            message = json.loads(line)
+            if message["type"] == "SCHEMA":
+                if message["stream"] in self._schemas:
+                    continue
+                self._schemas.add(message["stream"])
+            elif message["type"] == "STATE":
+                self.state["tenants"][name] = message["value"]
+                line = json.dumps({"type": "STATE", "value": self.state})
+            lines.append(line)
+        if lines:
+            self.output.write("\n".join(lines) + "\n")
+            self.output.flush()
+
+
+def sync_shards(
+    tap_class: Type,
+    shards: List[Shard],
+    catalog: Optional[dict],
+    state: Mapping[str, Any],
+    workers: int,
+    logger: Any,
+) -> None:
+    """Sync every shard in a pool of worker processes, merging their output.
+
+    Raises:
+        RuntimeError: When any shard failed, once every other shard is synced.
+    """
+    context = multiprocessing.get_context()
+    messages = context.Queue()
+    merger = ShardMerger(state, sys.stdout)
+    waiting = list(reversed(shards))
+    running: Dict[str, Any] = {}
+    failed: List[Tuple[str, str]] = []
+    try:
+        while waiting or running:
+            while waiting and len(running) < workers:
+                shard = waiting.pop()
+                process = context.Process(
+                    target=run_shard,
+                    args=(tap_class, shard, catalog, messages),
+                    name=f"shard-{shard.name}",
+                )
+                # Forked workers would write anything still buffered again.
+                sys.stdout.flush()
+                process.start()
+                running[shard.name] = process
+                logger.info(f"Started sync of '{shard.name}' in process {process.pid}.")
+            try:
+                name, kind, text = messages.get(timeout=1)
+            except queue.Empty:
+                # A worker that was killed never reports its end.
+                for name, process in list(running.items()):
+                    if process.exitcode is not None:
+                        running.pop(name).join()
+                        failed.append((name, f"Worker exited with code {process.exitcode}."))
+                continue
+            if kind == "messages":
+                merger.write(name, text)
+                continue
+            running.pop(name).join()
+            if kind == "done":
+                logger.info(f"Finished sync of '{name}'.")
+            else:
+                failed.append((name, text))
+    finally:
+        for process in running.values():
+            process.terminate()
+    for name, error in failed:
+        logger.error(f"Sync of '{name}' failed:\n{error}")
+    if failed:
+        raise RuntimeError(
+            "Sync failed for: " + ", ".join(name for name, _ in failed)
+        )
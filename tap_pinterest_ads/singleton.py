@@ -0,0 +1,38 @@
+"""Objects shared by the streams of a tap, one per configuration."""
+import os
+import threading
+from typing import Any, Dict, Hashable
+
+
+class KeyedSingletonMeta(type):
+    """Metaclass returning one shared instance per key of the constructor arguments.
+
+    Unlike the SDK's `SingletonMeta`, a tap created with other settings, e.g.
+    another login or pool size, gets instances of its own rather than those
+    built for the first tap of the process. Classes key their instances on
+    a subset of their arguments by overriding `get_instance_key`. Worker
+    processes forked from the tap start without any shared instances.
+    """
+
+    def __init__(cls, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        cls._instances: Dict[Hashable, Any] = {}
+        cls._instances_lock = threading.Lock()
+        cls._instances_pid = os.getpid()
+
+    def get_instance_key(cls, *args: Any, **kwargs: Any) -> Hashable:
+        """Return the key of the instance built from these arguments."""
+        return args, tuple(sorted(kwargs.items()))
+
+    def __call__(cls, *args: Any, **kwargs: Any) -> Any:
+        if cls._instances_pid != os.getpid():
+            # Sessions and database connections must not be shared with the parent.
+            cls._instances = {}
+            cls._instances_lock = threading.Lock()
+            cls._instances_pid = os.getpid()
+        key = cls.get_instance_key(*args, **kwargs)
+        with cls._instances_lock:
+            instance = cls._instances.get(key)
+            if instance is None:
+                instance = cls._instances[key] = super().__call__(*args, **kwargs)
+        return instance
@@ -1,13 +1,21 @@
 """Stream type classes for tap-pinterest."""
 import copy
 import datetime
-from urllib.parse import urlparse
-from urllib.parse import parse_qs
+import functools
+import itertools
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
-from typing import Any, Callable, Dict, Iterable, Optional
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple, Union
 
-from tap_pinterest_ads.client import PinterestStream
+from memoization import cached
+
+from tap_pinterest_ads.client import Checkpoint, PinterestStream
+from tap_pinterest_ads.entityindex import INDEX_FIELDS, EntityIndex, get_entity_index
+from tap_pinterest_ads.reports import get_report_records
+from tap_pinterest_ads.windows import MAX_WINDOW_DAYS, MAX_WINDOW_ROWS, DateWindow, WindowPlanner
 
 from singer_sdk.typing import (
     ArrayType,
@@ -25,6 +33,8 @@ class AdAccountStream(PinterestStream):
     path = 'ad_accounts'
     primary_keys = ["id"]
     replication_key = None
+    detect_changes = True
+    concurrent_children = True
     schema = PropertiesList(
         Property("id", StringType),
         Property("name", StringType),
@@ -37,6 +47,12 @@ class AdAccountStream(PinterestStream):
         Property("currency", StringType),
     ).to_dict()
 
+    def post_process(self, row: dict, context: Optional[dict] = None) -> Optional[dict]:
+        ad_account_ids = self.config.get("ad_account_ids")
+        if ad_account_ids and row["id"] not in ad_account_ids:
+            return None
+        return row
+
     def get_child_context(self, record: dict, context: Optional[dict]) -> dict:
         """Return a context dictionary for child streams."""
         return {
@@ -44,13 +60,113 @@ class AdAccountStream(PinterestStream):
         }
 
 
-class CampaignStream(PinterestStream):
-    name = 'campaigns'
+ENUMERATION_PAGE_SIZE = 250  # Maximum page size of the entity list endpoints
+
+
+class EntityPage(NamedTuple):
+    """Page token of an enumeration of entities, see `EntityStream.enumerate_records`."""
+
+    statuses: Optional[Tuple[str, ...]]
+    bookmark: Optional[str] = None
+
+
+class EntityStream(PinterestStream):
+    """Campaigns, ad groups or ads of an ad account, each with a status.
+
+    When the stream is only synced for the contexts of its children, e.g. for
+    analytics, its entities are enumerated with just the fields the contexts
+    need, filtered on the server to the statuses the children sync, and kept
+    in the `entity_index_path` index.
+    """
+
     parent_stream_type = AdAccountStream
-    path = "ad_accounts/{ad_account_id}/campaigns"
     ignore_parent_replication_keys = True
     primary_keys = ["id"]
     replication_key = None
+    incremental_replication_key = "updated_time"
+    detect_changes = True
+
+    @property
+    def entity_index(self) -> Optional[EntityIndex]:
+        """Return the entity index shared by all streams, if configured."""
+        return get_entity_index(self.config)
+
+    def get_enumerated_statuses(self) -> Optional[Tuple[str, ...]]:
+        """Return the statuses of the entities any synced child stream needs, or None for all."""
+        statuses: set = set()
+        for child_stream in self.child_streams:
+            if not (child_stream.selected or child_stream.has_selected_descendents):
+                continue
+            child_statuses = child_stream.get_parent_statuses()
+            if child_statuses is None:
+                return None
+            statuses |= child_statuses
+        return tuple(sorted(statuses))
+
+    def get_url_params(
+        self, context: Optional[dict], next_page_token: Optional[Any]
+    ) -> Dict[str, Any]:
+        if not isinstance(next_page_token, EntityPage):
+            return super().get_url_params(context, next_page_token)
+        params: dict = {"page_size": ENUMERATION_PAGE_SIZE}
+        if next_page_token.statuses:
+            params["entity_statuses"] = ",".join(next_page_token.statuses)
+        if next_page_token.bookmark:
+            params["bookmark"] = next_page_token.bookmark
+        return params
+
+    def fetch_records(self, context: Optional[dict]) -> Iterable[Dict[str, Any]]:
+        if self.selected:
+            return super().fetch_records(context)
+        return self.enumerate_records(context)
+
+    def request_entity_pages(
+        self, context: dict, statuses: Optional[Tuple[str, ...]]
+    ) -> Iterable[List[dict]]:
+        """Return the pages of entities of the given statuses, each reduced to the fields in `INDEX_FIELDS`.
+
+        The list endpoints cannot select fields, so whole entities are downloaded.
+        """
+        decorated_request = self.request_decorator(self._request)
+        page = EntityPage(statuses)
+        while True:
+            response = decorated_request(self.prepare_request(context, page), context)
+            yield [
+                {field: row.get(field) for field in INDEX_FIELDS}
+                for row in self.parse_response(response)
+            ]
+            bookmark = self.get_next_page_token(response, page)
+            if not bookmark:
+                return
+            page = page._replace(bookmark=bookmark)
+
+    def enumerate_records(self, context: dict) -> Iterable[Dict[str, Any]]:
+        """Return the entities of an ad account with only the fields needed by child streams.
+
+        Every page is listed, as the entities cannot be listed by update time and
+        any of them may have changed status. With an entity index, an account
+        listed within `entity_index_refresh_hours` is read from the index instead.
+        """
+        statuses = self.get_enumerated_statuses()
+        index = self.entity_index
+        if index is None:
+            for entities in self.request_entity_pages(context, statuses):
+                yield from entities
+            return
+        ad_account_id = context["ad_account_id"]
+        if index.is_fresh(self.name, ad_account_id, statuses):
+            yield from index.get_entities(self.name, ad_account_id, statuses)
+            return
+        entities = [
+            entity for page in self.request_entity_pages(context, statuses) for entity in page
+        ]
+        index.replace(self.name, ad_account_id, statuses, entities)
+        yield from entities
+
+
+class CampaignStream(EntityStream):
+    name = 'campaigns'
+    path = "ad_accounts/{ad_account_id}/campaigns"
     schema = PropertiesList(
         Property("id", StringType),
         Property("ad_account_id", StringType),
@@ -74,14 +190,18 @@ class CampaignStream(PinterestStream):
         Property("type", StringType),
     ).to_dict()
 
+    def get_child_context(self, record: dict, context: Optional[dict]) -> dict:
+        """Return a context dictionary for child streams."""
+        return {
+            "ad_account_id": record["ad_account_id"],
+            "campaign_id": record["id"],
+            "campaign_status": record["status"]
+        }
+
 
-class AdGroupStream(PinterestStream):
+class AdGroupStream(EntityStream):
     name = 'ad_groups'
-    parent_stream_type = AdAccountStream
     path = "ad_accounts/{ad_account_id}/ad_groups"
-    ignore_parent_replication_keys = True
-    primary_keys = ["id"]
-    replication_key = None
     schema = PropertiesList(
         Property("name", StringType),
         Property("status", StringType),
@@ -129,14 +249,18 @@ class AdGroupStream(PinterestStream):
         Property("updated_time", NumberType),
     ).to_dict()
 
+    def get_child_context(self, record: dict, context: Optional[dict]) -> dict:
+        """Return a context dictionary for child streams."""
+        return {
+            "ad_account_id": record["ad_account_id"],
+            "ad_group_id": record["id"],
+            "ad_group_status": record["status"]
+        }
+
 
-class AdStream(PinterestStream):
+class AdStream(EntityStream):
     name = 'ads'
-    parent_stream_type = AdAccountStream
     path = "ad_accounts/{ad_account_id}/ads"
-    ignore_parent_replication_keys = True
-    primary_keys = ["id"]
-    replication_key = None
     schema = PropertiesList(
         Property("ad_group_id", StringType),
         Property("android_deep_link", StringType),
@@ -184,6 +308,393 @@ class AdStream(PinterestStream):
         }
 
 
+# Metrics telling whether an ad delivered on a day.
+ACTIVITY_COLUMNS = ["IMPRESSION_1", "SPEND_IN_MICRO_DOLLAR"]
+# Days after which conversions are no longer attributed to a day, when
+# `attribution_window_days` is not set. Older analytics no longer change.
+DEFAULT_ATTRIBUTION_WINDOW_DAYS = 30
+# Analytics columns describing the entity or day of a row rather than measuring it.
+DIMENSION_COLUMNS = frozenset([
+    "AD_ACCOUNT_ID", "AD_GROUP_ENTITY_STATUS", "AD_GROUP_ID", "AD_ID",
+    "CAMPAIGN_DAILY_SPEND_CAP", "CAMPAIGN_ENTITY_STATUS", "CAMPAIGN_ID",
+    "CAMPAIGN_LIFETIME_SPEND_CAP", "CAMPAIGN_NAME", "DATE", "PIN_ID", "VIDEO_LENGTH",
+])
+
+
+@functools.lru_cache(maxsize=4096)
+def to_timestamp(date: str) -> str:
+    """Return an analytics `YYYY-MM-DD` date as an ISO timestamp.
+
+    Memoized, as a sync sees only a few hundred distinct dates over all rows.
+    """
+    return datetime.datetime.strptime(date, "%Y-%m-%d").strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class AnalyticsStream(PinterestStream):
+    """Daily analytics stream, paginated by windows of at most 100 days."""
+
+    records_jsonpath = "$[*]"
+    supports_streaming = True
+    supports_fast_output = True
+    ignore_parent_replication_keys = True
+    replication_key = "DATE"
+    # Every metric of the endpoint, in the order of the schema.
+    analytics_columns: List[str] = []
+    # Metrics requested when none is selected, as the API needs at least one.
+    default_columns = ACTIVITY_COLUMNS
+    # Report level of the stream, for `use_async_reports`.
+    report_level: str
+
+    @property
+    @cached
+    def columns(self) -> List[str]:
+        """Return the metrics selected in the catalog.
+
+        Computed once, after the catalog has been applied to the stream.
+        """
+        columns = [
+            column for column in self.analytics_columns
+            if self.mask.get(("properties", column), True)
+        ]
+        return columns or self.default_columns
+
+    @property
+    @cached
+    def columns_param(self) -> str:
+        return ','.join(self.columns)
+
+    @property
+    def detect_changes(self) -> bool:
+        """Return True to only output rows whose metrics changed, when re-syncing recent days."""
+        return bool(self.config.get("analytics_lookback_days"))
+
+    def get_start_date(self, context: dict) -> datetime.datetime:
+        """Return the earliest date to sync for the context."""
+        return self.apply_lookback(self.get_starting_timestamp(context))
+
+    def apply_lookback(self, start_date: datetime.datetime) -> datetime.datetime:
+        """Return the start date moved back to re-sync the last `analytics_lookback_days`.
+
+        Metrics such as conversions keep changing for days after the fact. The
+        start date is never moved before the configured `start_date`.
+        """
+        lookback = self.config.get("analytics_lookback_days")
+        if not lookback:
+            return start_date
+        today = datetime.datetime.now(tz=start_date.tzinfo).replace(hour=0, minute=0, second=0, microsecond=0)
+        lookback_date = today - datetime.timedelta(days=lookback)
+        if self.config.get("start_date"):
+            configured = datetime.datetime.strptime(self.config["start_date"][:10], "%Y-%m-%d")
+            lookback_date = max(lookback_date, configured.replace(tzinfo=start_date.tzinfo))
+        return min(start_date, lookback_date)
+
+    def get_date_window(self, context: Optional[dict], next_page_token: Optional[DateWindow]) -> DateWindow:
+        """Return the window of the page to request."""
+        if next_page_token:
+            return next_page_token
+        start_date = self.get_start_date(context)
+        yesterday = (datetime.datetime.now(tz=start_date.tzinfo) - datetime.timedelta(days=1)).date()
+        end_date = min((start_date + datetime.timedelta(days=MAX_WINDOW_DAYS)).date(), yesterday)
+        return DateWindow(start_date.date(), end_date, yesterday)
+
+    def prepare_request(
+        self, context: Optional[dict], next_page_token: Optional[DateWindow]
+    ) -> requests.PreparedRequest:
+        window = self.get_date_window(context, next_page_token)
+        request = super().prepare_request(context, window)
+        # get_next_page_token() is not given the window of the first page.
+        request.date_window = window
+        return request
+
+    def is_immutable_response(self, request: requests.PreparedRequest) -> bool:
+        """Return True if the requested window ends before the attribution window."""
+        window: Optional[DateWindow] = getattr(request, "date_window", None)
+        if window is None:
+            return False
+        days = self.config.get("attribution_window_days")
+        if days is None:
+            days = DEFAULT_ATTRIBUTION_WINDOW_DAYS
+        today = datetime.datetime.now(datetime.timezone.utc).date()
+        return window.end < today - datetime.timedelta(days=days)
+
+    def get_url_params(
+        self, context: Optional[dict], next_page_token: DateWindow
+    ) -> Optional[dict]:
+        params = {
+            'start_date': next_page_token.start.isoformat(),
+            'end_date': next_page_token.end.isoformat(),
+            'granularity': 'DAY',
+            'columns': self.columns_param,
+            'page_size': 100,
+        }
+        self.logger.debug(params)
+        return params
+
+    def post_process(self, row: dict, context: Optional[dict] = None) -> Optional[dict]:
+        row["DATE"] = to_timestamp(row["DATE"])
+        return row
+
+    @staticmethod
+    def is_empty_record(record: dict) -> bool:
+        """Return True if every metric of the record is zero or null."""
+        return not any(
+            value for key, value in record.items() if key not in DIMENSION_COLUMNS
+        )
+
+    def _write_record_message(self, record: dict) -> None:
+        # Filtered here rather than in post_process(), so that empty rows still
+        # advance the bookmark.
+        if self.config.get("skip_empty_records") and self.is_empty_record(record):
+            return
+        if self.config.get("sparse_records"):
+            record = {key: value for key, value in record.items() if value is not None}
+        super()._write_record_message(record)
+
+    def fetch_records(self, context: Optional[dict]) -> Iterable[Dict[str, Any]]:
+        if self.config.get("use_async_reports"):
+            return self.get_report_records(context)
+        if self.window_workers > 1:
+            return self.get_window_records(context)
+        return self.get_paged_window_records(context)
+
+    def get_report_records(self, context: dict) -> Iterable[Dict[str, Any]]:
+        """Return the rows of the context from asynchronous reports."""
+        start_date = self.get_start_date(context)
+        yesterday = (datetime.datetime.now(tz=start_date.tzinfo) - datetime.timedelta(days=1)).date()
+        rows = get_report_records(
+            self, context, self.report_level, self.columns, start_date.date(), yesterday
+        )
+        return self.process_rows(self.get_report_rows(rows, context), context)
+
+    def get_report_rows(
+        self, rows: Iterable[Tuple[Optional[str], dict]], context: dict
+    ) -> Iterable[dict]:
+        """Return the rows of the context among `(entity_id, row)` pairs of reports."""
+        for _, row in rows:
+            yield row
+
+    @property
+    def window_workers(self) -> int:
+        """Return the number of date windows of a context to fetch at once."""
+        return max(1, self.config.get("analytics_window_workers") or 1)
+
+    def get_checkpoint_partitions(self, context: dict) -> List[dict]:
+        """Return the state partitions bookmarked by the rows of a context."""
+        return [context]
+
+    def get_window_records(
+        self, context: dict
+    ) -> Iterable[Union[Dict[str, Any], Checkpoint]]:
+        """Return the rows of all date windows, fetching several at the same time.
+
+        Rows are returned in the order of the windows, each window followed by
+        a checkpoint, so the bookmark only covers the contiguous range of
+        windows that has been written.
+        """
+        first_window = self.get_date_window(context, None)
+        planner = WindowPlanner(first_window.start, first_window.last)
+        partitions = self.get_checkpoint_partitions(context)
+        pending = deque()
+        with ThreadPoolExecutor(
+            max_workers=self.window_workers, thread_name_prefix=f"{self.name}-windows"
+        ) as executor:
+            try:
+                while True:
+                    while len(pending) < self.window_workers:
+                        window = planner.next_window()
+                        if window is None:
+                            break
+                        pending.append((window, executor.submit(self.request_window, context, window)))
+                    if not pending:
+                        break
+                    window, future = pending.popleft()
+                    rows = self.count_window_rows(future.result(), planner)
+                    yield from self.process_rows(rows, context)
+                    yield Checkpoint(partitions, to_timestamp(window.end.isoformat()))
+            except BaseException:
+                for _, future in pending:
+                    future.cancel()
+                raise
+
+    def get_paged_window_records(
+        self, context: dict
+    ) -> Iterable[Union[Dict[str, Any], Checkpoint]]:
+        """Return the rows of one date window after the other, each followed by a checkpoint."""
+        partitions = self.get_checkpoint_partitions(context)
+        decorated_request = self.request_decorator(self._request)
+        window = None
+        while True:
+            prepared_request = self.prepare_request(context, window)
+            response = decorated_request(prepared_request, context)
+            yield from self.process_rows(self.parse_response(response), context)
+            window = prepared_request.date_window
+            yield Checkpoint(partitions, to_timestamp(window.end.isoformat()))
+            window = self.get_next_page_token(response, window)
+            if window is None:
+                return
+
+    def request_window(self, context: dict, window: DateWindow) -> Iterable[dict]:
+        """Return the rows of a single window, split in halves if it times out.
+
+        Only timeouts suggest the window is too large; other errors are raised
+        once the request decorator has given up retrying them. Streamed
+        responses are returned once their headers arrive and parsed as the
+        rows are read, other responses are parsed right away.
+        """
+        decorated_request = self.request_decorator(self._request)
+        try:
+            response = decorated_request(self.prepare_request(context, window), context)
+        except requests.exceptions.Timeout:
+            if window.start == window.end:
+                raise
+            self.logger.info(f"Splitting window from {window.start} to {window.end} after it timed out.")
+            first_half, second_half = window.split()
+            return itertools.chain(
+                self.request_window(context, first_half), self.request_window(context, second_half)
+            )
+        rows = self.parse_response(response)
+        return rows if self.stream_response else list(rows)
+
+    @staticmethod
+    def count_window_rows(rows: Iterable[dict], planner: WindowPlanner) -> Iterable[dict]:
+        """Yield the rows of a window, shrinking the windows planned next if it had too many."""
+        count = 0
+        for count, row in enumerate(rows, 1):
+            yield row
+        if count > MAX_WINDOW_ROWS:
+            planner.shrink()
+
+    def get_next_page_token(
+        self, response: requests.Response, previous_token: Optional[DateWindow]
+    ) -> Optional[DateWindow]:
+        window = response.request.date_window
+        if window.end >= window.last:
+            return None
+        start_date = window.end + datetime.timedelta(days=1)
+        end_date = min(start_date + datetime.timedelta(days=MAX_WINDOW_DAYS), window.last)
+        return DateWindow(start_date, end_date, window.last)
+
+
+class EntityAnalyticsStream(AnalyticsStream):
+    """Daily analytics of campaigns, ad groups or ads, requested for many at once.
+
+    Every entity is a state partition of its own, so entities synced in the
+    same batch keep separate bookmarks.
+    """
+
+    # Entity type, naming its child context keys, e.g. `ad_id` and `ad_status`,
+    # its URL parameter, e.g. `ad_ids`, and its analytics column, e.g. `AD_ID`.
+    entity_name: str
+
+    @property
+    def entity_key(self) -> str:
+        """Return the analytics column holding the ID of the entity."""
+        return f"{self.entity_name.upper()}_ID"
+
+    def get_checkpoint_partitions(self, context: dict) -> List[dict]:
+        return [{self.entity_key: entity_id} for entity_id in self.get_ids(context)]
+
+    def get_completion_units(self, context: dict) -> List[dict]:
+        return self.get_checkpoint_partitions(context)
+
+    def get_ids(self, context: dict) -> List[str]:
+        """Return the entity IDs covered by a single or batched context."""
+        return context.get(f"{self.entity_name}_ids") or [context[f"{self.entity_name}_id"]]
+
+    def is_skipped(self, context: dict) -> bool:
+        """Return True if the entity in the child context does not need syncing."""
+        return context[f"{self.entity_name}_status"] != "ACTIVE" and self.config.get("is_backfilled") == True
+
+    def get_parent_statuses(self) -> Optional[FrozenSet[str]]:
+        if self.config.get("is_backfilled") == True:
+            return frozenset(["ACTIVE"])
+        return None
+
+    def log_skipped(self, context: dict) -> None:
+        self.logger.info("Skipping inactive {entity} {entity_id} sync.".format(
+            entity=self.entity_name.replace("_", " "),
+            entity_id=context[f"{self.entity_name}_id"],
+        ))
+
+    def get_batch_context(self, contexts: List[dict]) -> Optional[dict]:
+        """Return a context requesting analytics for many entities of one account."""
+        ids = []
+        for context in contexts:
+            if self.is_skipped(context):
+                self.log_skipped(context)
+            else:
+                ids.append(context[f"{self.entity_name}_id"])
+        if not ids:
+            return None
+        return {
+            "ad_account_id": contexts[0]["ad_account_id"],
+            f"{self.entity_name}_ids": ids,
+        }
+
+    @property
+    def batch_size(self) -> int:
+        if self.config.get("use_async_reports"):
+            # A single report covers every entity of the account.
+            return sys.maxsize
+        return super().batch_size
+
+    def get_entity_starting_timestamp(self, context: dict, entity_id: str) -> datetime.datetime:
+        """Return the bookmark of a single entity, falling back to the stream bookmark."""
+        partition = {self.entity_key: entity_id}
+        if self.get_context_state(partition).get("replication_key_value"):
+            self._write_starting_replication_value(partition)
+            return self.get_starting_timestamp(partition)
+        return self.get_starting_timestamp(context)
+
+    def _increment_stream_state(
+        self, latest_record: Dict[str, Any], *, context: Optional[dict] = None
+    ) -> None:
+        # Bookmark every row against its own entity, also when syncing a batch.
+        partition = {self.entity_key: latest_record[self.entity_key]}
+        super()._increment_stream_state(latest_record, context=partition)
+
+    def get_start_date(self, context: dict) -> datetime.datetime:
+        """Return the earliest date to sync for the entities in the context."""
+        start_date = self.apply_lookback(min(
+            self.get_entity_starting_timestamp(context, entity_id)
+            for entity_id in self.get_ids(context)
+        ))
+        if start_date.date() < (datetime.datetime.now(tz=start_date.tzinfo) - datetime.timedelta(days=90)).date():
+            self.logger.info("Analytics can only lookback a maximum of 90 days, bringing start_date forward")
+            start_date = max(start_date, datetime.datetime.now(tz=start_date.tzinfo) - datetime.timedelta(days=89))
+        return start_date
+
+    def get_url_params(
+        self, context: Optional[dict], next_page_token: DateWindow
+    ) -> Optional[dict]:
+        params = super().get_url_params(context, next_page_token)
+        params[f"{self.entity_name}_ids"] = ','.join(self.get_ids(context))
+        return params
+
+    def get_records(self, context: Optional[dict] = None) -> Iterable[Dict[str, Any]]:
+        """Return a generator of row-type dictionary objects.
+        Each row emitted should be a dictionary of property names to their values.
+        """
+        if f"{self.entity_name}_ids" not in context and self.is_skipped(context):
+            self.log_skipped(context)
+            return
+        yield from super().get_records(context)
+        # The SDK only finalizes the bookmark of the partition matching the
+        # context, whereas every entity is a partition of its own.
+        for entity_id in self.get_ids(context):
+            self.finalize_state_progress_markers(self.get_context_state({self.entity_key: entity_id}))
+
+    def get_report_rows(
+        self, rows: Iterable[Tuple[Optional[str], dict]], context: dict
+    ) -> Iterable[dict]:
+        """Return the rows of the entities in the context, as reports cover the whole account."""
+        ids = set(self.get_ids(context))
+        for entity_id, row in rows:
+            row[self.entity_key] = str(row.get(self.entity_key) or entity_id)
+            if row[self.entity_key] in ids:
+                yield row
+
+
 AD_ANALYTICS_COLUMNS = [
     "AD_ACCOUNT_ID", "AD_GROUP_ENTITY_STATUS", "AD_GROUP_ID",
     "AD_ID", "CAMPAIGN_DAILY_SPEND_CAP", "CAMPAIGN_ENTITY_STATUS",
@@ -223,15 +734,17 @@ AD_ANALYTICS_COLUMNS = [
     "WEB_CHECKOUT_COST_PER_ACTION", "WEB_CHECKOUT_ROAS"
 ]
 
-class AdAnalyticsStream(PinterestStream):
+class AdAnalyticsStream(EntityAnalyticsStream):
     name = 'ad_analytics'
     parent_stream_type = AdStream
     path = "ad_accounts/{ad_account_id}/ads/analytics"
-    records_jsonpath = "$[*]"
-    ignore_parent_replication_keys = True
     primary_keys = ["AD_ID", "DATE"]
-    replication_key = "DATE"
+    analytics_columns = AD_ANALYTICS_COLUMNS
+    entity_name = "ad"
+    report_level = "AD"
     state_partitioning_keys = ["AD_ID"]
+    batch_size_setting = "ad_analytics_batch_size"
+    max_batch_size = 100  # Maximum number of ad_ids accepted by the API
     properties = [
         Property("AD_ID", StringType),
         Property("DATE", DateTimeType),
@@ -239,53 +752,118 @@ class AdAnalyticsStream(PinterestStream):
     properties += [Property(a, NumberType) for a in AD_ANALYTICS_COLUMNS]
     schema = PropertiesList(*properties).to_dict()
 
-    def get_url_params(
-        self, context: Optional[dict], next_page_token: Optional[Any]
-    ) -> Optional[dict]:
-        if next_page_token:
-            start_date = next_page_token
-        else:
-            start_date = self.get_starting_timestamp(context)
-            if start_date.date() < (datetime.datetime.now(tz=start_date.tzinfo) - datetime.timedelta(days=90)).date():
-                self.logger.info("Ad analytics can only lookback a maximum of 90 days, bringing start_date forward")
-                start_date = max(start_date, datetime.datetime.now(tz=start_date.tzinfo) - datetime.timedelta(days=89))
-        yesterday = (datetime.datetime.now(tz=start_date.tzinfo) - datetime.timedelta(days=1)).date()
-        end_date = min((start_date + datetime.timedelta(days=100)).date(), yesterday)
-        params = {
-            'start_date': start_date.strftime('%Y-%m-%d'),
-            'end_date': end_date.strftime('%Y-%m-%d'),
-            'granularity': 'DAY',
-            'columns': ','.join(AD_ANALYTICS_COLUMNS),
-            'page_size': 100,
-            'ad_ids': context["ad_id"],
-        }
-        self.logger.debug(params)
-        return params
+    @property
+    @cached
+    def columns(self) -> List[str]:
+        columns = super().columns
+        if self.config.get("attribution_window_days") is not None:
+            # The activity index is built from these, even if not selected.
+            columns = [
+                column for column in self.analytics_columns
+                if column in columns or column in ACTIVITY_COLUMNS
+            ]
+        return columns
 
-    def post_process(self, row: dict, context: Optional[dict] = None) -> Optional[dict]:
-        row["DATE"] = datetime.datetime.strptime(row["DATE"], "%Y-%m-%d").strftime("%Y-%m-%dT%H:%M:%SZ")
-        return row
+    def is_skipped(self, context: dict) -> bool:
+        """Return True if the ad in the child context does not need syncing."""
+        attribution_window = self.config.get("attribution_window_days")
+        if attribution_window is None:
+            return super().is_skipped(context)
+        return not self.is_recently_active(context, attribution_window)
 
-    def get_records(self, context: Optional[dict] = None) -> Iterable[Dict[str, Any]]:
-        """Return a generator of row-type dictionary objects.
-        Each row emitted should be a dictionary of property names to their values.
+    def get_parent_statuses(self) -> Optional[FrozenSet[str]]:
+        if self.config.get("attribution_window_days") is not None:
+            # Status changes of any ad are tracked in the activity index.
+            return None
+        return super().get_parent_statuses()
+
+    def get_activity(self, ad_id: str) -> dict:
+        """Return the activity index of an ad, kept in its state partition."""
+        return self.get_context_state({"AD_ID": ad_id}).setdefault("activity", {})
+
+    def is_recently_active(self, context: dict, attribution_window: int) -> bool:
+        """Return True if the ad may have new analytics since it was last synced.
+
+        Ads are synced while their last delivery or status change lies within
+        the attribution window, so late conversions are still collected. Other
+        active ads are checked once per window for renewed delivery; as their
+        bookmark only advances when synced, no dates are missed in between.
         """
-        if context["ad_status"] != "ACTIVE" and self.config["is_backfilled"] == True:
-            self.logger.info("Skipping inactive ad {ad_id} sync.".format(ad_id=context["ad_id"]))
-            return []
-        return super().get_records(context)
+        activity = self.get_activity(context["ad_id"])
+        today = datetime.datetime.now(datetime.timezone.utc).date()
+        if activity.get("status") != context["ad_status"]:
+            if "status" in activity:
+                activity["status_changed_date"] = today.isoformat()
+            activity["status"] = context["ad_status"]
+        horizon = (today - datetime.timedelta(days=attribution_window)).isoformat()
+        last_checked = activity.get("last_checked_date")
+        active = (
+            last_checked is None
+            or activity.get("last_delivery_date", "") >= horizon
+            or activity.get("status_changed_date", "") >= horizon
+            or (context["ad_status"] == "ACTIVE" and last_checked <= horizon)
+        )
+        if active:
+            activity["last_checked_date"] = today.isoformat()
+        return active
+
+    def _increment_stream_state(
+        self, latest_record: Dict[str, Any], *, context: Optional[dict] = None
+    ) -> None:
+        super()._increment_stream_state(latest_record, context=context)
+        if any(latest_record.get(column) for column in ACTIVITY_COLUMNS):
+            activity = self.get_activity(latest_record["AD_ID"])
+            date = latest_record["DATE"][:10]
+            if date > activity.get("last_delivery_date", ""):
+                activity["last_delivery_date"] = date
+
+
+# Ad analytics columns that apply to ad groups and campaigns as a whole.
+AD_GROUP_ANALYTICS_COLUMNS = [
+    column for column in AD_ANALYTICS_COLUMNS if column not in ("AD_ID", "PIN_ID")
+]
+CAMPAIGN_ANALYTICS_COLUMNS = [
+    column for column in AD_GROUP_ANALYTICS_COLUMNS
+    if column not in ("AD_GROUP_ENTITY_STATUS", "AD_GROUP_ID")
+]
 
-    def get_next_page_token(
-        self, response: requests.Response, previous_token: Optional[Any]
-    ) -> Any:
-        end_date = datetime.datetime.strptime(parse_qs(urlparse(response.request.url).query)['end_date'][0], '%Y-%m-%d')
-        start_date = datetime.datetime.strptime(parse_qs(urlparse(response.request.url).query)['start_date'][0], '%Y-%m-%d')
-        yesterday = datetime.datetime.now(tz=start_date.tzinfo) - datetime.timedelta(days=1)
-        if end_date.date() < yesterday.date():
-            next_page_token = end_date + datetime.timedelta(days=1)
-        else:
-            next_page_token = None
-        return next_page_token
+
+class AdGroupAnalyticsStream(EntityAnalyticsStream):
+    name = 'ad_group_analytics'
+    parent_stream_type = AdGroupStream
+    path = "ad_accounts/{ad_account_id}/ad_groups/analytics"
+    primary_keys = ["AD_GROUP_ID", "DATE"]
+    analytics_columns = AD_GROUP_ANALYTICS_COLUMNS
+    entity_name = "ad_group"
+    report_level = "AD_GROUP"
+    state_partitioning_keys = ["AD_GROUP_ID"]
+    batch_size_setting = "ad_group_analytics_batch_size"
+    max_batch_size = 250  # Maximum number of ad_group_ids accepted by the API
+    properties = [
+        Property("AD_GROUP_ID", StringType),
+        Property("DATE", DateTimeType),
+    ]
+    properties += [Property(a, NumberType) for a in AD_GROUP_ANALYTICS_COLUMNS if a != "AD_GROUP_ID"]
+    schema = PropertiesList(*properties).to_dict()
+
+
+class CampaignAnalyticsStream(EntityAnalyticsStream):
+    name = 'campaign_analytics'
+    parent_stream_type = CampaignStream
+    path = "ad_accounts/{ad_account_id}/campaigns/analytics"
+    primary_keys = ["CAMPAIGN_ID", "DATE"]
+    analytics_columns = CAMPAIGN_ANALYTICS_COLUMNS
+    entity_name = "campaign"
+    report_level = "CAMPAIGN"
+    state_partitioning_keys = ["CAMPAIGN_ID"]
+    batch_size_setting = "campaign_analytics_batch_size"
+    max_batch_size = 250  # Maximum number of campaign_ids accepted by the API
+    properties = [
+        Property("CAMPAIGN_ID", StringType),
+        Property("DATE", DateTimeType),
+    ]
+    properties += [Property(a, NumberType) for a in CAMPAIGN_ANALYTICS_COLUMNS if a != "CAMPAIGN_ID"]
+    schema = PropertiesList(*properties).to_dict()
 
 
 ACCOUNT_ANALYTICS_COLUMNS = [
@@ -322,14 +900,13 @@ ACCOUNT_ANALYTICS_COLUMNS = [
     "WEB_CHECKOUT_ROAS"
 ]
 
-class AccountAnalyticsStream(PinterestStream):
+class AccountAnalyticsStream(AnalyticsStream):
     name = 'account_analytics'
     parent_stream_type = AdAccountStream
     path = "ad_accounts/{ad_account_id}/analytics"
-    records_jsonpath = "$[*]"
-    ignore_parent_replication_keys = True
     primary_keys = ["AD_ACCOUNT_ID", "DATE"]
-    replication_key = "DATE"
+    analytics_columns = ACCOUNT_ANALYTICS_COLUMNS
+    report_level = "ADVERTISER"
     properties = [
         Property("AD_ACCOUNT_ID", StringType),
         Property("DATE", DateTimeType),
@@ -337,37 +914,9 @@ class AccountAnalyticsStream(PinterestStream):
     properties += [Property(a, NumberType) for a in ACCOUNT_ANALYTICS_COLUMNS]
     schema = PropertiesList(*properties).to_dict()
 
-    def get_url_params(
-        self, context: Optional[dict], next_page_token: Optional[Any]
-    ) -> Optional[dict]:
-        if next_page_token:
-            start_date = next_page_token
-        else:
-            start_date = self.get_starting_timestamp(context)
-        yesterday = (datetime.datetime.now(tz=start_date.tzinfo) - datetime.timedelta(days=1)).date()
-        end_date = min((start_date + datetime.timedelta(days=100)).date(), yesterday)
-        params = {
-            'start_date': start_date.strftime('%Y-%m-%d'),
-            'end_date': end_date.strftime('%Y-%m-%d'),
-            'granularity': 'DAY',
-            'columns': ','.join(ACCOUNT_ANALYTICS_COLUMNS),
-            'page_size': 100,
-        }
-        self.logger.debug(params)
-        return params
-    
-    def post_process(self, row: dict, context: Optional[dict] = None) -> Optional[dict]:
-        row["DATE"] = datetime.datetime.strptime(row["DATE"], "%Y-%m-%d").strftime("%Y-%m-%dT%H:%M:%SZ")
-        return row
-
-    def get_next_page_token(
-        self, response: requests.Response, previous_token: Optional[Any]
-    ) -> Any:
-        end_date = datetime.datetime.strptime(parse_qs(urlparse(response.request.url).query)['end_date'][0], '%Y-%m-%d')
-        start_date = datetime.datetime.strptime(parse_qs(urlparse(response.request.url).query)['start_date'][0], '%Y-%m-%d')
-        yesterday = datetime.datetime.now(tz=start_date.tzinfo) - datetime.timedelta(days=1)
-        if end_date.date() < yesterday.date():
-            next_page_token = end_date + datetime.timedelta(days=1)
-        else:
-            next_page_token = None
-        return next_page_token
+    def get_report_rows(
+        self, rows: Iterable[Tuple[Optional[str], dict]], context: dict
+    ) -> Iterable[dict]:
+        for _, row in rows:
+            row.setdefault("AD_ACCOUNT_ID", context["ad_account_id"])
+            yield row
@@ -1,16 +1,26 @@
 """pinterest tap class."""
 
+import os
+import sys
 from typing import List
 
 from singer_sdk import Tap, Stream
+from singer_sdk.exceptions import ConfigValidationError
 from singer_sdk import typing as th  # JSON schema typing helpers
 
+from tap_pinterest_ads.changecache import get_change_cache
+from tap_pinterest_ads.httpcache import get_response_cache
+from tap_pinterest_ads.metrics import MetricsCollector
+from tap_pinterest_ads.output import PipelinedOutput, RecordWriter
+from tap_pinterest_ads.shards import get_shards, sync_shards
 from tap_pinterest_ads.streams import (
     AdAccountStream,
     CampaignStream,
     AdGroupStream,
     AdStream,
     AdAnalyticsStream,
+    AdGroupAnalyticsStream,
+    CampaignAnalyticsStream,
     AccountAnalyticsStream
 )
 STREAM_TYPES = [
@@ -19,6 +29,8 @@ STREAM_TYPES = [
     AdGroupStream,
     AdStream,
     AdAnalyticsStream,
+    AdGroupAnalyticsStream,
+    CampaignAnalyticsStream,
     AccountAnalyticsStream
 ]
 
@@ -43,8 +55,28 @@ class TapPinterestAds(Tap):
         th.Property(
             "refresh_token",
             th.StringType,
-            required=True,
-            description="Refresh token obtained from the OAuth user flow"
+            description="Refresh token obtained from the OAuth user flow, required unless `credentials` are given"
+        ),
+        th.Property(
+            "credentials",
+            th.ArrayType(th.ObjectType(
+                th.Property("name", th.StringType),
+                th.Property("client_id", th.StringType),
+                th.Property("client_secret", th.StringType),
+                th.Property("refresh_token", th.StringType, required=True),
+                th.Property("ad_account_ids", th.ArrayType(th.StringType)),
+            )),
+            description="Logins to sync in worker processes, each defaulting to the top-level settings"
+        ),
+        th.Property(
+            "shard_workers",
+            th.IntegerType,
+            description="Number of logins in `credentials` to sync at once, by default the number of CPU cores"
+        ),
+        th.Property(
+            "ad_account_ids",
+            th.ArrayType(th.StringType),
+            description="Only sync these ad accounts"
         ),
         th.Property(
             "start_date",
@@ -58,8 +90,210 @@ class TapPinterestAds(Tap):
             default=False,
             description="Set to True once backfilled in order to reduce API calls per day"
         ),
+        th.Property(
+            "attribution_window_days",
+            th.IntegerType,
+            description="Days after its last delivery or status change to keep syncing an ad's analytics"
+        ),
+        th.Property(
+            "ad_analytics_batch_size",
+            th.IntegerType,
+            default=100,
+            description="Number of ads to request ad analytics for in a single call (max 100)"
+        ),
+        th.Property(
+            "ad_group_analytics_batch_size",
+            th.IntegerType,
+            default=100,
+            description="Number of ad groups to request ad group analytics for in a single call (max 250)"
+        ),
+        th.Property(
+            "campaign_analytics_batch_size",
+            th.IntegerType,
+            default=100,
+            description="Number of campaigns to request campaign analytics for in a single call (max 250)"
+        ),
+        th.Property(
+            "max_workers",
+            th.IntegerType,
+            default=1,
+            description="Number of ad accounts to fetch child streams for concurrently"
+        ),
+        th.Property(
+            "analytics_window_workers",
+            th.IntegerType,
+            default=1,
+            description="Number of date windows of an analytics context to fetch concurrently"
+        ),
+        th.Property(
+            "fast_record_output",
+            th.BooleanType,
+            default=False,
+            description="Write analytics records through a buffered output path with a precomputed schema"
+        ),
+        th.Property(
+            "analytics_lookback_days",
+            th.IntegerType,
+            description="Days of analytics to sync again on every run, for late conversions"
+        ),
+        th.Property(
+            "sparse_records",
+            th.BooleanType,
+            default=False,
+            description="Leave null metrics out of analytics records"
+        ),
+        th.Property(
+            "skip_empty_records",
+            th.BooleanType,
+            default=False,
+            description="Do not output analytics records whose metrics are all zero"
+        ),
+        th.Property(
+            "change_cache_path",
+            th.StringType,
+            description="File to keep record hashes in, to only output changed entities"
+        ),
+        th.Property(
+            "change_cache_retention_days",
+            th.IntegerType,
+            default=30,
+            description="Days to keep the hash of an entity that is no longer synced"
+        ),
+        th.Property(
+            "entity_index_path",
+            th.StringType,
+            description="SQLite file indexing the campaigns, ad groups and ads listed for analytics streams"
+        ),
+        th.Property(
+            "entity_index_refresh_hours",
+            th.NumberType,
+            default=0,
+            description="Hours to enumerate the entities of an ad account from the index before listing them again"
+        ),
+        th.Property(
+            "http_cache_path",
+            th.StringType,
+            description="SQLite file to cache API responses in, to re-run syncs without requesting them again"
+        ),
+        th.Property(
+            "http_cache_ttl_seconds",
+            th.IntegerType,
+            default=3600,
+            description="Seconds to serve cached responses for, except analytics older than the attribution window"
+        ),
+        th.Property(
+            "http_cache_replay",
+            th.BooleanType,
+            default=False,
+            description="Answer every request from the response cache, failing on responses not cached"
+        ),
+        th.Property(
+            "state_flush_interval",
+            th.IntegerType,
+            default=60,
+            description="Minimum number of seconds between STATE messages emitted for progress within a stream"
+        ),
+        th.Property(
+            "prometheus_textfile_path",
+            th.StringType,
+            description="File to write performance metrics to in the Prometheus text format"
+        ),
+        th.Property(
+            "use_async_reports",
+            th.BooleanType,
+            default=False,
+            description="Fetch analytics through asynchronous reports, one per ad account and date range"
+        ),
+        th.Property(
+            "max_requests_per_second",
+            th.NumberType,
+            description="Maximum request rate, also once the API reports its rate limit budget"
+        ),
+        th.Property(
+            "http_pool_size",
+            th.IntegerType,
+            default=10,
+            description="Number of HTTP connections to keep open, raised to fit the worker threads"
+        ),
+        th.Property(
+            "http_keep_alive",
+            th.BooleanType,
+            default=True,
+            description="Reuse HTTP connections and enable TCP keep-alive on them"
+        ),
+        th.Property(
+            "token_cache_path",
+            th.StringType,
+            description="File to cache OAuth access tokens in, shared by concurrent runs"
+        ),
+        th.Property(
+            "pipelined_sync",
+            th.BooleanType,
+            default=False,
+            description="Fetch ahead of the output and write messages from a dedicated thread"
+        ),
+        th.Property(
+            "stream_analytics_responses",
+            th.BooleanType,
+            default=False,
+            description="Parse analytics responses row by row as they download"
+        ),
+        th.Property(
+            "incremental_entities",
+            th.BooleanType,
+            default=False,
+            description="Only emit campaigns, ad groups and ads updated since the last run"
+        ),
     ).to_dict()
 
     def discover_streams(self) -> List[Stream]:
         """Return a list of discovered streams."""
         return [stream_class(tap=self) for stream_class in STREAM_TYPES]
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        if kwargs.get("validate_config", True) and not (
+            self.config.get("refresh_token") or self.config.get("credentials")
+        ):
+            raise ConfigValidationError("Config requires a `refresh_token` or `credentials`.")
+
+    def sync_all(self) -> None:
+        """Sync all streams, storing record hashes and clearing the sync progress once every stream succeeded."""
+        if self.config.get("credentials"):
+            self.sync_shards()
+            return
+        output = None
+        if self.config.get("pipelined_sync"):
+            output = PipelinedOutput(sys.stdout)
+            sys.stdout = output
+        try:
+            super().sync_all()
+            for stream in self.streams.values():
+                stream.clear_sync_progress()
+            change_cache = get_change_cache(self.config)
+            if change_cache:
+                change_cache.commit()
+            response_cache = get_response_cache(self.config)
+            if response_cache:
+                response_cache.evict_expired()
+        finally:
+            RecordWriter().flush()
+            if output is not None:
+                sys.stdout = output.stream
+                output.close()
+            self.write_performance_metrics()
+
+    def sync_shards(self) -> None:
+        """Sync every login in `credentials` in a pool of worker processes."""
+        shards = get_shards(self.config, self.state)
+        workers = self.config.get("shard_workers") or os.cpu_count() or 1
+        catalog = self.input_catalog.to_dict() if self.input_catalog else None
+        self.logger.info(f"Syncing {len(shards)} logins in up to {workers} worker processes.")
+        sync_shards(type(self), shards, catalog, self.state, workers, self.logger)
+
+    def write_performance_metrics(self) -> None:
+        """Log the performance metrics of every stream and write the Prometheus textfile."""
+        for stream in self.streams.values():
+            stream.write_performance_metrics()
+        if self.config.get("prometheus_textfile_path"):
+            MetricsCollector().write_prometheus(self.config["prometheus_textfile_path"])
@@ -0,0 +1,255 @@
+"""Benchmark a full sync of the tap against the local mock API, or its hot paths.
+
+Run as `python -m tap_pinterest_ads.tests.benchmark --help` for the options.
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import sys
+import time
+import timeit
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from singer_sdk.helpers.jsonpath import extract_jsonpath
+
+from tap_pinterest_ads.shards import RECORD_PREFIXES
+from tap_pinterest_ads.streams import AD_ANALYTICS_COLUMNS, DateWindow, to_timestamp
+from tap_pinterest_ads.tap import TapPinterestAds
+from tap_pinterest_ads.tests.mock_api import MockPinterestAPI
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore
+
+
+class MessageCounter(io.TextIOBase):
+    """Output sink counting the Singer messages written to it."""
+
+    def __init__(self) -> None:
+        self.records = 0
+        self.messages = 0
+        self.bytes = 0
+
+    def write(self, text: str) -> int:
+        self.messages += text.count("\n")
+        self.records += sum(text.count(prefix) for prefix in RECORD_PREFIXES)
+        self.bytes += len(text)
+        return len(text)
+
+
+def get_peak_rss_mb() -> Optional[float]:
+    """Return the peak resident set size of this process in MB."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and in kilobytes elsewhere.
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def make_tap(
+    api: MockPinterestAPI,
+    config: Dict[str, Any],
+    state: Optional[dict] = None,
+    catalog: Optional[dict] = None,
+) -> TapPinterestAds:
+    """Return a tap whose streams and authenticator request the mock API."""
+    tap = TapPinterestAds(config=config, state=state or {}, catalog=catalog)
+    for stream in tap.streams.values():
+        stream.url_base = api.url_base
+    authenticator = next(iter(tap.streams.values())).authenticator
+    authenticator._auth_endpoint = api.url_base + "oauth/token"
+    authenticator.access_token = None
+    authenticator.last_refreshed = None
+    return tap
+
+
+def run_benchmark(
+    api: MockPinterestAPI,
+    config: Dict[str, Any],
+    state: Optional[dict] = None,
+    catalog: Optional[dict] = None,
+) -> Dict[str, Any]:
+    """Run a full sync against a started mock API and return its measurements."""
+    tap = make_tap(api, config, state, catalog)
+    output = MessageCounter()
+    requests_before = api.requests
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        tap.sync_all()
+    wall_time = time.perf_counter() - started
+    requests = api.requests - requests_before
+    return {
+        "wall_time": round(wall_time, 3),
+        "requests": requests,
+        "requests_per_second": round(requests / wall_time, 1),
+        "rate_limited": api.rate_limited,
+        "records": output.records,
+        "records_per_second": round(output.records / wall_time, 1),
+        "output_bytes": output.bytes,
+        "peak_rss_mb": get_peak_rss_mb(),
+    }
+
+
+MICRO_CONFIG = {
+    "client_id": "client_id",
+    "client_secret": "client_secret",
+    "refresh_token": "refresh_token",
+}
+
+
+def time_per_call(func: Callable[[], Any], repeat: int = 5, number: int = 20) -> float:
+    """Return the seconds per call of the fastest of `repeat` runs of `number` calls."""
+    return min(timeit.repeat(func, repeat=repeat, number=number)) / number
+
+
+def compare(tap: Callable[[], Any], baseline: Callable[[], Any], number: int) -> Dict[str, Any]:
+    """Return the time per call of the tap and of the baseline it replaces, in milliseconds."""
+    tap_seconds = time_per_call(tap, number=number)
+    baseline_seconds = time_per_call(baseline, number=number)
+    return {
+        "tap_ms": round(tap_seconds * 1000, 4),
+        "baseline_ms": round(baseline_seconds * 1000, 4),
+        "speedup": round(baseline_seconds / tap_seconds, 2),
+    }
+
+
+def benchmark_response_parsing(rows: int = 500, number: int = 20) -> Dict[str, Any]:
+    """Time reading the records and next page token of a page, against the SDK's JSONPath parsing."""
+    stream = TapPinterestAds(config=MICRO_CONFIG).streams["ads"]
+    content = json.dumps({
+        "items": [{column: n for column in AD_ANALYTICS_COLUMNS} for n in range(rows)],
+        "bookmark": "bookmark",
+    }).encode("utf-8")
+
+    def make_response() -> requests.Response:
+        response = requests.Response()
+        response._content = content
+        response.status_code = 200
+        response.encoding = "utf-8"
+        return response
+
+    def tap_parse() -> None:
+        response = make_response()
+        list(stream.parse_response(response))
+        stream.get_next_page_token(response, None)
+
+    def sdk_parse() -> None:
+        # The SDK decodes the body for the records and again for the token.
+        response = make_response()
+        list(extract_jsonpath("$.items[*]", input=response.json()))
+        next(iter(extract_jsonpath("$.bookmark", input=response.json())), None)
+
+    return {
+        "rows": rows,
+        **compare(tap_parse, sdk_parse, number),
+    }
+
+
+def benchmark_date_conversion(rows: int = 3000, number: int = 20) -> Dict[str, Any]:
+    """Time converting the DATE of analytics rows, against parsing and formatting every date."""
+    stream = TapPinterestAds(config=MICRO_CONFIG).streams["account_analytics"]
+    # A year of daily rows repeats each date for every ad of a response.
+    dates = [
+        (datetime.date(2022, 1, 1) + datetime.timedelta(days=n % 365)).isoformat()
+        for n in range(rows)
+    ]
+
+    def tap_convert() -> None:
+        for date in dates:
+            stream.post_process({"DATE": date})
+
+    def strptime_convert() -> None:
+        for date in dates:
+            datetime.datetime.strptime(date, "%Y-%m-%d").strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    to_timestamp.cache_clear()
+    return {
+        "rows": rows,
+        **compare(tap_convert, strptime_convert, number),
+    }
+
+
+def benchmark_window_token(number: int = 20) -> Dict[str, Any]:
+    """Time finding the next date window of an analytics page, against parsing it from the URL."""
+    stream = TapPinterestAds(config=MICRO_CONFIG).streams["account_analytics"]
+    last = datetime.date(2022, 12, 31)
+    window = DateWindow(datetime.date(2022, 1, 1), datetime.date(2022, 4, 11), last)
+    response = requests.Response()
+    response.request = requests.Request(
+        "GET", stream.url_base, params=stream.get_url_params({"ad_account_id": "123"}, window)
+    ).prepare()
+    response.request.date_window = window
+
+    def tap_token() -> None:
+        for _ in range(1000):
+            stream.get_next_page_token(response, window)
+
+    def url_token() -> None:
+        for _ in range(1000):
+            query = parse_qs(urlparse(response.request.url).query)
+            start_date = datetime.date.fromisoformat(query["end_date"][0]) + datetime.timedelta(days=1)
+            DateWindow(start_date, min(start_date + datetime.timedelta(days=100), last), last)
+
+    return {
+        "pages": 1000,
+        **compare(tap_token, url_token, number),
+    }
+
+
+def run_micro_benchmarks(number: int = 20) -> Dict[str, Dict[str, Any]]:
+    """Time the per-response and per-row hot paths of the tap without any requests."""
+    return {
+        "response_parsing": benchmark_response_parsing(number=number),
+        "date_conversion": benchmark_date_conversion(number=number),
+        "window_token": benchmark_window_token(number=number),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=3)
+    parser.add_argument("--campaigns", type=int, default=5)
+    parser.add_argument("--ad-groups", type=int, default=5)
+    parser.add_argument("--ads", type=int, default=50)
+    parser.add_argument("--days", type=int, default=30, help="Days of analytics to sync")
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds per request")
+    parser.add_argument("--rate-limit-every", type=int, help="Answer every Nth request with a 429")
+    parser.add_argument("--retry-after", type=float, default=0.1)
+    parser.add_argument("--config", type=json.loads, default={}, help="Extra tap config as JSON")
+    parser.add_argument(
+        "--micro", action="store_true", help="Time the hot paths of the tap instead of a full sync"
+    )
+    args = parser.parse_args()
+    if args.micro:
+        print(json.dumps(run_micro_benchmarks(), indent=2))
+        return
+
+    start_date = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=args.days)
+    config = {
+        "client_id": "client_id",
+        "client_secret": "client_secret",
+        "refresh_token": "refresh_token",
+        "start_date": start_date.strftime("%Y-%m-%dT00:00:00Z"),
+        **args.config,
+    }
+    with MockPinterestAPI(
+        accounts=args.accounts,
+        campaigns=args.campaigns,
+        ad_groups=args.ad_groups,
+        ads=args.ads,
+        latency=args.latency,
+        rate_limit_every=args.rate_limit_every,
+        retry_after=args.retry_after,
+    ) as api:
+        print(json.dumps(run_benchmark(api, config), indent=2))
+
+
+if __name__ == "__main__":
+    main()
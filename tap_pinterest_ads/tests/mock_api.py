@@ -0,0 +1,184 @@
+"""Local mock of the Pinterest v5 endpoints used by the tap."""
+
+import datetime
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+
+class MockPinterestAPI:
+    """Serve ad accounts, their entities and analytics from a local server.
+
+    Every GET is delayed by `latency` seconds, and every `rate_limit_every`th
+    request is answered with a 429 asking to retry after `retry_after`
+    seconds. Request and byte counts are kept for reporting.
+    """
+
+    def __init__(
+        self,
+        accounts: int = 3,
+        campaigns: int = 2,
+        ad_groups: int = 2,
+        ads: int = 10,
+        latency: float = 0.0,
+        rate_limit_every: Optional[int] = None,
+        retry_after: float = 0.1,
+    ) -> None:
+        self.accounts = accounts
+        self.campaigns = campaigns
+        self.ad_groups = ad_groups
+        self.ads = ads
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.requests = 0
+        self.rate_limited = 0
+        self.token_requests = 0
+        self.bytes_sent = 0
+        # Conversions attributed to a date after the fact, by ISO date.
+        self.late_conversions: Dict[str, float] = {}
+        # Statuses of entities changed after they were created, by ID.
+        self.statuses: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url_base(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v5/"
+
+    def __enter__(self) -> "MockPinterestAPI":
+        api = self
+
+        class Handler(MockHandler):
+            mock = api
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def count_request(self) -> bool:
+        """Count a request, returning True if it is to be rate limited."""
+        with self._lock:
+            self.requests += 1
+            limited = bool(self.rate_limit_every) and self.requests % self.rate_limit_every == 0
+            self.rate_limited += limited
+            return limited
+
+    def list_entities(self, account_id: str, kind: str) -> List[dict]:
+        counts = {"campaigns": self.campaigns, "ad_groups": self.ad_groups, "ads": self.ads}
+        entities = []
+        for n in range(counts[kind]):
+            entity_id = f"{account_id}-{kind}-{n}"
+            entity = {
+                "id": entity_id,
+                "ad_account_id": account_id,
+                "name": f"{kind} {n}",
+                "status": self.statuses.get(entity_id, "ACTIVE" if n % 4 else "PAUSED"),
+                "created_time": 1640995200,
+                "updated_time": 1640995200 + n,
+            }
+            if kind == "ads":
+                entity["ad_group_id"] = f"{account_id}-ad_groups-{n % max(1, self.ad_groups)}"
+            entities.append(entity)
+        return entities
+
+    def analytics_rows(self, query: Dict[str, List[str]], keys: List[Dict[str, str]]) -> List[dict]:
+        start = datetime.date.fromisoformat(query["start_date"][0])
+        end = datetime.date.fromisoformat(query["end_date"][0])
+        columns = query["columns"][0].split(",")
+        rows = []
+        for day in range(start.toordinal(), end.toordinal() + 1):
+            date = datetime.date.fromordinal(day).isoformat()
+            for key in keys:
+                row = dict(key, DATE=date)
+                for n, column in enumerate(columns):
+                    if column not in row:
+                        row[column] = (day + n) % 7 * 1.5
+                if "TOTAL_CONVERSIONS" in row:
+                    row["TOTAL_CONVERSIONS"] += self.late_conversions.get(date, 0)
+                rows.append(row)
+        return rows
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """Request handler answering from the `mock` API it is bound to."""
+
+    mock: MockPinterestAPI
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+    def send_json(self, body: Any, status: int = 200, headers: Optional[dict] = None) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+        with self.mock._lock:
+            self.mock.bytes_sent += len(data)
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        with self.mock._lock:
+            self.mock.token_requests += 1
+        self.send_json({"access_token": "access_token", "expires_in": 3600})
+
+    def do_GET(self) -> None:
+        if self.mock.latency:
+            time.sleep(self.mock.latency)
+        if self.mock.count_request():
+            return self.send_json(
+                {"code": 8, "message": "Rate limit exceeded"},
+                status=429,
+                headers={"X-RateLimit-Reset": str(self.mock.retry_after)},
+            )
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        path = url.path.strip("/").split("/")[1:]
+        if path == ["ad_accounts"]:
+            accounts = [
+                {"id": str(n), "name": f"Account {n}", "country": "US", "currency": "USD"}
+                for n in range(self.mock.accounts)
+            ]
+            return self.send_page(accounts, query)
+        account_id, endpoint = path[1], path[2:]
+        if endpoint in (["campaigns"], ["ad_groups"], ["ads"]):
+            entities = self.mock.list_entities(account_id, endpoint[0])
+            if "entity_statuses" in query:
+                statuses = query["entity_statuses"][0].split(",")
+                entities = [entity for entity in entities if entity["status"] in statuses]
+            return self.send_page(entities, query)
+        if endpoint == ["ads", "analytics"]:
+            keys = [{"AD_ID": ad_id} for ad_id in query["ad_ids"][0].split(",")]
+            return self.send_json(self.mock.analytics_rows(query, keys))
+        if endpoint == ["ad_groups", "analytics"]:
+            keys = [{"AD_GROUP_ID": ad_group_id} for ad_group_id in query["ad_group_ids"][0].split(",")]
+            return self.send_json(self.mock.analytics_rows(query, keys))
+        if endpoint == ["campaigns", "analytics"]:
+            keys = [{"CAMPAIGN_ID": campaign_id} for campaign_id in query["campaign_ids"][0].split(",")]
+            return self.send_json(self.mock.analytics_rows(query, keys))
+        if endpoint == ["analytics"]:
+            keys = [{"AD_ACCOUNT_ID": account_id}]
+            return self.send_json(self.mock.analytics_rows(query, keys))
+        self.send_json({"code": 404, "message": "Not found"}, status=404)
+
+    def send_page(self, items: List[dict], query: Dict[str, List[str]]) -> None:
+        page_size = int(query.get("page_size", ["25"])[0])
+        start = int(query.get("bookmark", ["0"])[0])
+        end = start + page_size
+        self.send_json({
+            "items": items[start:end],
+            "bookmark": str(end) if end < len(items) else None,
+        })
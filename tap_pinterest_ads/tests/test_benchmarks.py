@@ -0,0 +1,300 @@
+"""Micro-benchmarks guarding the per-response and per-row hot paths."""
+
+import contextlib
+import datetime
+import io
+import json
+import re
+import threading
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from singer_sdk.helpers.jsonpath import extract_jsonpath
+
+from tap_pinterest_ads import client, streams
+from tap_pinterest_ads.client import PinterestStream
+from tap_pinterest_ads.output import OUTPUT_BUFFER_SIZE, PipelinedOutput
+from tap_pinterest_ads.streams import AD_ANALYTICS_COLUMNS, DateWindow, to_timestamp
+from tap_pinterest_ads.tap import TapPinterestAds
+from tap_pinterest_ads.tests.benchmark import run_benchmark, run_micro_benchmarks
+from tap_pinterest_ads.tests.mock_api import MockPinterestAPI
+
+SAMPLE_CONFIG = {
+    "client_id": "client_id",
+    "client_secret": "client_secret",
+    "refresh_token": "refresh_token",
+}
+
+ROWS = [{column: n for column in AD_ANALYTICS_COLUMNS} for n in range(500)]
+
+
+def make_response(content: bytes) -> requests.Response:
+    response = requests.Response()
+    response._content = content
+    response.status_code = 200
+    response.encoding = "utf-8"
+    return response
+
+
+def test_single_parse_of_paginated_response(monkeypatch):
+    stream = TapPinterestAds(config=SAMPLE_CONFIG).streams["ads"]
+    content = json.dumps({"items": ROWS, "bookmark": "bookmark"}).encode("utf-8")
+    response = make_response(content)
+    expected_rows = list(extract_jsonpath("$.items[*]", response.json()))
+    expected_token = next(iter(extract_jsonpath("$.bookmark", response.json())), None)
+
+    decodes = []
+    decode = requests.Response.json
+    monkeypatch.setattr(requests.Response, "json", lambda self: decodes.append(self) or decode(self))
+
+    def no_jsonpath(*args, **kwargs):
+        raise AssertionError("JSONPath evaluated for a fixed path")
+
+    monkeypatch.setattr(client, "extract_jsonpath", no_jsonpath)
+    response = make_response(content)
+    assert list(stream.parse_response(response)) == expected_rows
+    assert stream.get_next_page_token(response, None) == expected_token
+    # The body is decoded once for both the rows and the next page token.
+    assert len(decodes) == 1
+
+
+def test_micro_benchmarks_compare_with_baseline():
+    results = run_micro_benchmarks(number=1)
+    assert set(results) == {"response_parsing", "date_conversion", "window_token"}
+    for result in results.values():
+        assert result["tap_ms"] > 0
+        assert result["baseline_ms"] > 0
+
+
+def test_memoized_date_conversion():
+    stream = TapPinterestAds(config=SAMPLE_CONFIG).streams["account_analytics"]
+    dates = [
+        (datetime.date(2022, 1, 1) + datetime.timedelta(days=n % 300)).isoformat()
+        for n in range(3000)
+    ]
+
+    expected = [
+        datetime.datetime.strptime(date, "%Y-%m-%d").strftime("%Y-%m-%dT%H:%M:%SZ")
+        for date in dates
+    ]
+    to_timestamp.cache_clear()
+    assert [stream.post_process({"DATE": date})["DATE"] for date in dates] == expected
+    # Each distinct date is converted once.
+    cache_info = to_timestamp.cache_info()
+    assert (cache_info.misses, cache_info.hits) == (300, 2700)
+
+
+def test_structured_window_token():
+    stream = TapPinterestAds(config=SAMPLE_CONFIG).streams["account_analytics"]
+    last = datetime.date(2022, 12, 31)
+    window = DateWindow(datetime.date(2022, 1, 1), datetime.date(2022, 4, 11), last)
+    params = stream.get_url_params({"ad_account_id": "123"}, window)
+    response = make_response(b"[]")
+    response.request = requests.Request("GET", stream.url_base, params=params).prepare()
+    response.request.date_window = window
+
+    # The window the URL was built from.
+    query = parse_qs(urlparse(response.request.url).query)
+    end_date = datetime.date.fromisoformat(query["end_date"][0])
+
+    # The token comes from the structured window, without parsing the URL again.
+    response.request.url = stream.url_base
+    next_window = stream.get_next_page_token(response, window)
+    assert next_window == DateWindow(end_date + datetime.timedelta(days=1), datetime.date(2022, 7, 21), last)
+    response.request.date_window = DateWindow(datetime.date(2022, 12, 1), last, last)
+    assert stream.get_next_page_token(response, window) is None
+
+
+def test_full_sync_against_mock_api(tmp_path):
+    start_date = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=3)
+    config = {
+        **SAMPLE_CONFIG,
+        "start_date": start_date.strftime("%Y-%m-%dT00:00:00Z"),
+        "prometheus_textfile_path": str(tmp_path / "tap.prom"),
+    }
+    with MockPinterestAPI(accounts=2, campaigns=2, ad_groups=2, ads=4, rate_limit_every=5, retry_after=0.01) as api:
+        result = run_benchmark(api, config)
+
+    # Per account: 2 campaigns, 2 ad groups, 4 ads, 3 days for each of them and the account.
+    assert result["records"] == 2 * (1 + 2 + 2 + 4 + (2 + 2 + 4) * 3 + 3)
+    assert result["rate_limited"] > 0
+    assert api.token_requests == 1
+
+    # Metrics accumulate over the process, so other tests may add to them.
+    metrics = {}
+    for line in (tmp_path / "tap.prom").read_text().splitlines():
+        if not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            metrics[name] = float(value)
+    assert metrics['tap_pinterest_records_total{stream="ad_analytics"}'] >= 2 * 4 * 3
+    assert sum(v for k, v in metrics.items() if k.startswith("tap_pinterest_http_rate_limited_total")) > 0
+    assert metrics['tap_pinterest_http_request_duration_seconds_bucket{stream="ads",le="+Inf"}'] > 0
+
+
+def test_replay_sync_from_response_cache(tmp_path):
+    start_date = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=3)
+    config = {
+        **SAMPLE_CONFIG,
+        "start_date": start_date.strftime("%Y-%m-%dT00:00:00Z"),
+        "http_cache_path": str(tmp_path / "responses.db"),
+    }
+    with MockPinterestAPI(accounts=2, campaigns=2, ad_groups=2, ads=4) as api:
+        recorded = run_benchmark(api, config)
+        token_requests = api.token_requests
+        replayed = run_benchmark(api, {**config, "http_cache_replay": True})
+
+    assert recorded["requests"] > 0
+    assert replayed["requests"] == 0
+    assert api.token_requests == token_requests
+    assert replayed["records"] == recorded["records"]
+
+
+def test_entity_index_enumerates_ads_for_analytics(tmp_path, monkeypatch):
+    monkeypatch.setattr(streams, "ENUMERATION_PAGE_SIZE", 2)
+    start_date = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=3)
+    config = {
+        **SAMPLE_CONFIG,
+        "start_date": start_date.strftime("%Y-%m-%dT00:00:00Z"),
+        "is_backfilled": True,
+        "ad_analytics_batch_size": 100,
+        "entity_index_path": str(tmp_path / "entities.db"),
+    }
+    catalog = TapPinterestAds(config=config).catalog_dict
+    for entry in catalog["streams"]:
+        for metadata in entry["metadata"]:
+            if not metadata["breadcrumb"]:
+                metadata["metadata"]["selected"] = entry["tap_stream_id"] == "ad_analytics"
+    cached_config = {**config, "entity_index_refresh_hours": 24}
+
+    with MockPinterestAPI(accounts=2, campaigns=1, ad_groups=1, ads=8) as api:
+        listed = run_benchmark(api, config, catalog=catalog)
+        cached = run_benchmark(api, cached_config, catalog=catalog)
+        # The oldest ad of the first account, paused so far, is activated again.
+        api.statuses["0-ads-0"] = "ACTIVE"
+        stale = run_benchmark(api, cached_config, catalog=catalog)
+        relisted = run_benchmark(api, config, catalog=catalog)
+
+    # Per account: 3 pages of 6 active ads, only listed without a recent listing.
+    assert listed["requests"] - cached["requests"] == 2 * 3
+    assert listed["records"] == cached["records"] == stale["records"] == 2 * 6 * 3
+    # Every page is listed again, so a status change of any ad is picked up.
+    assert relisted["requests"] - listed["requests"] == 1
+    assert relisted["records"] == (2 * 6 + 1) * 3
+
+
+def test_analytics_lookback_outputs_changed_rows(tmp_path):
+    start_date = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=5)
+    config = {
+        **SAMPLE_CONFIG,
+        "start_date": start_date.strftime("%Y-%m-%dT00:00:00Z"),
+        "analytics_lookback_days": 3,
+        "change_cache_path": str(tmp_path / "changes.db"),
+    }
+    yesterday = (datetime.date.today() - datetime.timedelta(days=1)).isoformat()
+    with MockPinterestAPI(accounts=2, campaigns=1, ad_groups=1, ads=2) as api:
+        first = run_benchmark(api, config)
+        unchanged = run_benchmark(api, config)
+        api.late_conversions[yesterday] = 1
+        changed = run_benchmark(api, config)
+
+    assert first["records"] > 0
+    assert unchanged["records"] == 0
+    # Per account, the row of yesterday of the account, its campaign, ad group and 2 ads.
+    assert changed["records"] == 2 * (1 + 1 + 1 + 2)
+
+
+def test_pipelined_output_overlaps_slow_target():
+    class BlockedTarget(io.StringIO):
+        def __init__(self):
+            super().__init__()
+            self.unblocked = threading.Event()
+
+        def write(self, text):
+            self.unblocked.wait(5)
+            return super().write(text)
+
+    target = BlockedTarget()
+    lines = OUTPUT_BUFFER_SIZE // 1000 * 4
+    output = PipelinedOutput(target)
+    # The tap keeps writing while the target has not read anything yet.
+    for n in range(lines):
+        output.write(json.dumps({"type": "RECORD", "stream": "s", "record": {"n": n, "x": "x" * 1000}}) + "\n")
+    output.write('{"type": "STATE", "value": {}}\n')
+    assert target.getvalue() == ""
+    target.unblocked.set()
+    output.close()
+
+    messages = [json.loads(line) for line in target.getvalue().splitlines()]
+    assert [message["record"]["n"] for message in messages[:-1]] == list(range(lines))
+    assert messages[-1]["type"] == "STATE"
+
+
+def test_sharded_sync_merges_logins(tmp_path, monkeypatch):
+    start_date = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=3)
+    config = {
+        "client_id": "client_id",
+        "client_secret": "client_secret",
+        "start_date": start_date.strftime("%Y-%m-%dT00:00:00Z"),
+        "credentials": [
+            {"name": "first", "refresh_token": "first", "ad_account_ids": ["0"]},
+            {"name": "second", "refresh_token": "second", "ad_account_ids": ["1", "2"]},
+        ],
+        "shard_workers": 2,
+        "change_cache_path": str(tmp_path / "changes.db"),
+        "http_cache_path": str(tmp_path / "responses.db"),
+        "entity_index_path": str(tmp_path / "entities.db"),
+    }
+    output = io.StringIO()
+    with MockPinterestAPI(accounts=3, campaigns=1, ad_groups=1, ads=2) as api:
+        # Workers create their own streams and authenticator, pointed at the mock.
+        monkeypatch.setattr(PinterestStream, "url_base", api.url_base)
+        with contextlib.redirect_stdout(output):
+            TapPinterestAds(config=config).sync_all()
+
+    messages = [json.loads(line) for line in output.getvalue().splitlines()]
+    schemas = [message["stream"] for message in messages if message["type"] == "SCHEMA"]
+    accounts = [
+        message["record"]["id"] for message in messages
+        if message["type"] == "RECORD" and message["stream"] == "ad_accounts"
+    ]
+    states = [message["value"] for message in messages if message["type"] == "STATE"]
+    assert len(schemas) == len(set(schemas))
+    assert sorted(accounts) == ["0", "1", "2"]
+    assert set(states[-1]["tenants"]) == {"first", "second"}
+    assert "ad_analytics" in states[-1]["tenants"]["second"]["bookmarks"]
+    assert api.token_requests == 2
+    # Workers never write the same SQLite file.
+    assert sorted(path.name for path in tmp_path.iterdir() if path.suffix == ".db") == [
+        f"{file}.{name}.db" for file in ("changes", "responses") for name in ("first", "second")
+    ]
+
+
+def test_fast_record_output():
+    rows = [{**row, "DATE": "2022-01-01T00:00:00Z"} for row in ROWS]
+    baseline_stream = TapPinterestAds(config=SAMPLE_CONFIG).streams["ad_analytics"]
+    fast_stream = TapPinterestAds(
+        config={**SAMPLE_CONFIG, "fast_record_output": True}
+    ).streams["ad_analytics"]
+    assert not baseline_stream.fast_output and fast_stream.fast_output
+
+    def write(stream):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            for row in rows:
+                stream._write_record_message(row)
+            stream._write_state_message()
+        return output.getvalue()
+
+    def messages(text):
+        messages = [json.loads(line) for line in text.splitlines()]
+        for message in messages:
+            # Formatted like Singer does, at the time of writing.
+            time_extracted = message.pop("time_extracted", None)
+            assert time_extracted is None or re.fullmatch(r"\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d\.\d{6}Z", time_extracted)
+        return messages
+
+    fast_messages = messages(write(fast_stream))
+    assert fast_messages == messages(write(baseline_stream))
+    assert len(fast_messages) == len(rows) + 1
+    assert fast_messages[-1]["type"] == "STATE"
@@ -0,0 +1,131 @@
+"""Tests the rate limiter against a fake clock."""
+
+import email.utils
+
+import pytest
+import requests
+
+from tap_pinterest_ads import ratelimit
+from tap_pinterest_ads.client import MAX_RATE_LIMIT_RETRIES
+from tap_pinterest_ads.ratelimit import RateLimiter, RateLimitError, get_retry_after
+from tap_pinterest_ads.tap import TapPinterestAds
+
+SAMPLE_CONFIG = {
+    "client_id": "client_id",
+    "client_secret": "client_secret",
+    "refresh_token": "refresh_token",
+}
+NOW = 1_700_000_000.0
+
+
+class FakeClock:
+    """Stand-in for the `time` module, where sleeping advances the clock at once."""
+
+    def __init__(self) -> None:
+        self.now = NOW
+        self.sleeps = []
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeLogger:
+    def warning(self, message: str) -> None:
+        pass
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(ratelimit, "time", clock)
+    return clock
+
+
+def make_response(status_code: int = 200, **headers: str) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update({name.replace("_", "-"): value for name, value in headers.items()})
+    return response
+
+
+def test_retry_after_headers(clock):
+    assert get_retry_after(make_response(Retry_After="5")) == 5
+    retry_at = email.utils.formatdate(NOW + 30, usegmt=True)
+    assert get_retry_after(make_response(Retry_After=retry_at)) == 30
+    assert get_retry_after(make_response(X_RateLimit_Reset="12, 12;w=60")) == 12
+    assert get_retry_after(make_response(X_RateLimit_Reset=str(int(NOW + 20)))) == 20
+    assert get_retry_after(make_response()) is None
+
+
+def test_token_bucket_paces_requests(clock):
+    limiter = RateLimiter(logger=FakeLogger(), requests_per_second=2)
+    assert [limiter.acquire() for _ in range(2)] == [0, 0]
+    assert limiter.acquire() == 0.5
+    assert limiter.acquire() == 0.5
+    clock.now += 10
+    # The bucket refills up to its capacity only.
+    assert [limiter.acquire() for _ in range(3)] == [0, 0, 0.5]
+
+
+def test_rate_follows_remaining_budget(clock):
+    limiter = RateLimiter(logger=FakeLogger())
+    assert limiter.acquire() == 0
+    limiter.update(make_response(
+        X_RateLimit_Limit="100", X_RateLimit_Remaining="10", X_RateLimit_Reset="5"
+    ))
+    assert (limiter.limit, limiter.remaining, limiter.rate) == (100, 10, 2.0)
+    assert limiter.acquire() == 0
+    assert limiter.acquire() == 0.5
+
+
+def test_remaining_budget_never_exceeds_configured_rate(clock):
+    limiter = RateLimiter(logger=FakeLogger(), requests_per_second=2)
+    limiter.update(make_response(X_RateLimit_Remaining="1000", X_RateLimit_Reset="10"))
+    assert limiter.rate == 2
+    limiter.update(make_response(X_RateLimit_Remaining="5", X_RateLimit_Reset="10"))
+    assert limiter.rate == 0.5
+
+
+def test_limiter_is_shared_per_login_and_rate(clock):
+    streams = TapPinterestAds(config=SAMPLE_CONFIG).streams
+    assert streams["ads"].rate_limiter is streams["campaigns"].rate_limiter
+    capped = TapPinterestAds(config={**SAMPLE_CONFIG, "max_requests_per_second": 5}).streams["ads"]
+    assert capped.rate_limiter.max_rate == 5
+    other = TapPinterestAds(config={**SAMPLE_CONFIG, "refresh_token": "other"}).streams["ads"]
+    assert other.rate_limiter is not streams["ads"].rate_limiter
+
+
+def test_rate_limited_response_blocks_until_reset(clock):
+    limiter = RateLimiter(logger=FakeLogger(), requests_per_second=10)
+    limiter.update(make_response(429, Retry_After="3"))
+    assert limiter.acquire() == 3
+    # The bucket refilled while blocked.
+    assert limiter.acquire() == 0
+    limiter.update(make_response(429))
+    assert limiter.acquire() == ratelimit.DEFAULT_RETRY_AFTER
+
+
+def test_rate_limited_requests_are_retried(clock):
+    stream = TapPinterestAds(config=SAMPLE_CONFIG).streams["ads"]
+    calls = []
+
+    def request(fail_times):
+        calls.append(fail_times)
+        if len(calls) <= fail_times:
+            raise RateLimitError("Rate limited")
+        return "response"
+
+    assert stream.request_decorator(request)(2) == "response"
+    assert len(calls) == 3
+
+    calls.clear()
+    with pytest.raises(RateLimitError):
+        stream.request_decorator(request)(MAX_RATE_LIMIT_RETRIES)
+    assert len(calls) == MAX_RATE_LIMIT_RETRIES
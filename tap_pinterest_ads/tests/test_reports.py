@@ -0,0 +1,129 @@
+"""Tests the asynchronous report engine against a local fake report server."""
+
+import datetime
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from singer_sdk.helpers._util import utc_now
+
+from tap_pinterest_ads.jsonstream import iter_items
+from tap_pinterest_ads.tap import TapPinterestAds
+
+YESTERDAY = (datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=1)).date()
+
+SAMPLE_CONFIG = {
+    "client_id": "client_id",
+    "client_secret": "client_secret",
+    "refresh_token": "refresh_token",
+    "start_date": (YESTERDAY - datetime.timedelta(days=2)).strftime("%Y-%m-%dT00:00:00Z"),
+    "use_async_reports": True,
+}
+
+
+class FakeReportServer(BaseHTTPRequestHandler):
+    """Serve the create, poll and download steps of the report flow."""
+
+    reports: dict = {}
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        token = f"token-{len(self.reports)}"
+        self.reports[token] = {"request": body, "polls": 0}
+        self._send_json({"report_status": "IN_PROGRESS", "token": token})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.startswith("/download/"):
+            return self._send_json(self._report_file(self.reports[url.path.split("/")[-1]]["request"]))
+        report = self.reports[parse_qs(url.query)["token"][0]]
+        report["polls"] += 1
+        if report["polls"] < 2:
+            return self._send_json({"report_status": "IN_PROGRESS"})
+        host = self.headers["Host"]
+        self._send_json({
+            "report_status": "FINISHED",
+            "url": f"http://{host}/download/{parse_qs(url.query)['token'][0]}",
+        })
+
+    @staticmethod
+    def _report_file(request):
+        start = datetime.date.fromisoformat(request["start_date"])
+        end = datetime.date.fromisoformat(request["end_date"])
+        dates = [start + datetime.timedelta(days=n) for n in range((end - start).days + 1)]
+        entity_ids = ["111", "222"] if request["level"] == "AD" else ["123"]
+        return {
+            entity_id: [
+                {"DATE": date.isoformat(), "IMPRESSION_1": 10, "SPEND_IN_MICRO_DOLLAR": 5}
+                for date in dates
+            ]
+            for entity_id in entity_ids
+        }
+
+
+@pytest.fixture
+def tap():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeReportServer)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    FakeReportServer.reports = {}
+    tap = TapPinterestAds(config=SAMPLE_CONFIG)
+    for stream in tap.streams.values():
+        stream.url_base = f"http://127.0.0.1:{server.server_address[1]}/v5/"
+    authenticator = tap.streams["account_analytics"].authenticator
+    authenticator.access_token = "access_token"
+    authenticator.last_refreshed = utc_now()
+    authenticator.expires_in = 3600
+    yield tap
+    server.shutdown()
+
+
+def test_account_analytics_report(tap):
+    stream = tap.streams["account_analytics"]
+    context = {"ad_account_id": "123"}
+    stream._write_starting_replication_value(context)
+
+    records = list(stream.get_records(context))
+
+    assert [r["DATE"] for r in records] == [
+        (YESTERDAY - datetime.timedelta(days=n)).strftime("%Y-%m-%dT00:00:00Z")
+        for n in (2, 1, 0)
+    ]
+    assert all(r["AD_ACCOUNT_ID"] == "123" for r in records)
+    (report,) = FakeReportServer.reports.values()
+    assert report["request"]["level"] == "ADVERTISER"
+    assert report["request"]["end_date"] == YESTERDAY.isoformat()
+
+
+def test_ad_analytics_report_filters_batch(tap):
+    stream = tap.streams["ad_analytics"]
+    context = stream.get_batch_context([
+        {"ad_account_id": "123", "ad_id": "111", "ad_status": "ACTIVE"},
+    ])
+    stream._write_starting_replication_value(context)
+
+    records = list(stream.get_records(context))
+
+    assert len(records) == 3
+    assert {r["AD_ID"] for r in records} == {"111"}
+    assert len(FakeReportServer.reports) == 1
+
+
+def test_iter_items_across_chunks():
+    document = json.dumps({"1": [{"a": 1.5, "b": "x,]}"}, {"a": 22}], "2": []}).encode("utf-8")
+    for size in (1, 3, 64):
+        chunks = [document[i:i + size] for i in range(0, len(document), size)]
+        assert list(iter_items(chunks)) == [("1", {"a": 1.5, "b": "x,]}"}), ("1", {"a": 22})]
@@ -0,0 +1,336 @@
+"""Tests stream behaviour that does not depend on the API."""
+
+import datetime
+import json
+import time
+
+import pytest
+import requests
+
+from singer_sdk.exceptions import RetriableAPIError
+
+from tap_pinterest_ads.changecache import ChangeCache
+from tap_pinterest_ads.client import Checkpoint
+from tap_pinterest_ads.httpcache import ResponseCache
+from tap_pinterest_ads.session import get_pool_size
+from tap_pinterest_ads.streams import DateWindow
+from tap_pinterest_ads.tap import TapPinterestAds
+from tap_pinterest_ads.windows import WindowPlanner
+
+real_time = time.time
+TODAY = datetime.datetime.now(datetime.timezone.utc).date()
+
+SAMPLE_CONFIG = {
+    "client_id": "client_id",
+    "client_secret": "client_secret",
+    "refresh_token": "refresh_token",
+    "incremental_entities": True,
+}
+
+
+def test_incremental_entities_skip_unchanged(monkeypatch):
+    stream = TapPinterestAds(config=SAMPLE_CONFIG).streams["ads"]
+    context = {"ad_account_id": "123"}
+    stream.get_context_state(context).update(
+        {"replication_key": "updated_time", "replication_key_value": 200}
+    )
+    ads = [
+        {"id": str(n), "ad_account_id": "123", "status": "ACTIVE", "updated_time": n * 100}
+        for n in range(4)
+    ]
+    monkeypatch.setattr(stream, "fetch_records", lambda context: iter(ads))
+    synced = []
+    monkeypatch.setattr(stream, "_sync_children", synced.append)
+
+    records = list(stream.get_records(context))
+
+    assert stream.replication_key == "updated_time"
+    assert [r["id"] for r in records] == ["2", "3"]
+    # Unchanged ads still have their analytics synced.
+    assert [c["ad_id"] for c in synced] == ["0", "1"]
+
+
+def test_incremental_entities_override_catalog():
+    tap = TapPinterestAds(config={**SAMPLE_CONFIG, "incremental_entities": False})
+    catalog = tap.catalog_dict
+    tap = TapPinterestAds(config=SAMPLE_CONFIG, catalog=catalog)
+
+    assert tap.streams["campaigns"].replication_key == "updated_time"
+
+
+def test_incremental_entities_first_run_emits_all(monkeypatch):
+    stream = TapPinterestAds(config=SAMPLE_CONFIG).streams["campaigns"]
+    campaigns = [{"id": str(n), "updated_time": n} for n in range(3)]
+    monkeypatch.setattr(stream, "fetch_records", lambda context: iter(campaigns))
+
+    assert list(stream.get_records({"ad_account_id": "123"})) == campaigns
+
+
+def days_ago(days: int) -> str:
+    return (TODAY - datetime.timedelta(days=days)).isoformat()
+
+
+def test_activity_index_skips_dormant_ads():
+    tap = TapPinterestAds(config={**SAMPLE_CONFIG, "attribution_window_days": 7})
+    stream = tap.streams["ad_analytics"]
+    ads = [
+        # (ad_id, current status, activity index from the previous run)
+        ("new", "ACTIVE", {}),
+        ("delivering", "PAUSED", {"status": "PAUSED", "last_checked_date": days_ago(1), "last_delivery_date": days_ago(5)}),
+        ("dormant", "PAUSED", {"status": "PAUSED", "last_checked_date": days_ago(1), "last_delivery_date": days_ago(30)}),
+        ("resumed", "ACTIVE", {"status": "PAUSED", "last_checked_date": days_ago(1)}),
+        ("idle", "ACTIVE", {"status": "ACTIVE", "last_checked_date": days_ago(1)}),
+        ("recheck", "ACTIVE", {"status": "ACTIVE", "last_checked_date": days_ago(7)}),
+    ]
+    for ad_id, _, activity in ads:
+        stream.get_activity(ad_id).update(activity)
+
+    batch_context = stream.get_batch_context([
+        {"ad_account_id": "123", "ad_id": ad_id, "ad_status": status}
+        for ad_id, status, _ in ads
+    ])
+
+    assert batch_context["ad_ids"] == ["new", "delivering", "resumed", "recheck"]
+    assert stream.get_activity("resumed")["status_changed_date"] == TODAY.isoformat()
+    assert stream.get_activity("recheck")["last_checked_date"] == TODAY.isoformat()
+    assert stream.get_activity("idle")["last_checked_date"] == days_ago(1)
+
+
+def test_activity_index_tracks_last_delivery():
+    stream = TapPinterestAds(config=SAMPLE_CONFIG).streams["ad_analytics"]
+    for date, impressions in (("2022-01-02", 5), ("2022-01-03", 0), ("2022-01-01", 3)):
+        stream._increment_stream_state(
+            {"AD_ID": "111", "DATE": f"{date}T00:00:00Z", "IMPRESSION_1": impressions}
+        )
+
+    assert stream.get_activity("111")["last_delivery_date"] == "2022-01-02"
+
+
+def test_ad_group_analytics_batch_ids():
+    tap = TapPinterestAds(config={**SAMPLE_CONFIG, "is_backfilled": True})
+    stream = tap.streams["ad_group_analytics"]
+    assert stream.batch_size == 100
+    batch_context = stream.get_batch_context([
+        {"ad_account_id": "123", "ad_group_id": "1", "ad_group_status": "ACTIVE"},
+        {"ad_account_id": "123", "ad_group_id": "2", "ad_group_status": "PAUSED"},
+        {"ad_account_id": "123", "ad_group_id": "3", "ad_group_status": "ACTIVE"},
+    ])
+    assert batch_context == {"ad_account_id": "123", "ad_group_ids": ["1", "3"]}
+
+    window = DateWindow(TODAY, TODAY, TODAY)
+    params = stream.get_url_params(batch_context, window)
+    assert params["ad_group_ids"] == "1,3"
+    assert "AD_ID" not in params["columns"].split(",")
+
+    # Rows of a batch are bookmarked against their own ad group.
+    stream._increment_stream_state({"AD_GROUP_ID": "3", "DATE": "2022-01-02T00:00:00Z"})
+    progress = stream.get_context_state({"AD_GROUP_ID": "3"})["progress_markers"]
+    assert progress["replication_key_value"] == "2022-01-02T00:00:00Z"
+
+
+def test_analytics_columns_follow_catalog_selection():
+    catalog = TapPinterestAds(config=SAMPLE_CONFIG).catalog_dict
+    for entry in catalog["streams"]:
+        for metadata in entry["metadata"]:
+            breadcrumb = metadata["breadcrumb"]
+            if breadcrumb and breadcrumb[-1] not in ("CTR", "DATE", "AD_ID", "AD_ACCOUNT_ID"):
+                metadata["metadata"]["selected"] = False
+    tap = TapPinterestAds(config=SAMPLE_CONFIG, catalog=catalog)
+
+    window = DateWindow(TODAY, TODAY, TODAY)
+    params = tap.streams["account_analytics"].get_url_params({"ad_account_id": "123"}, window)
+    assert params["columns"] == "CTR"
+
+    tap = TapPinterestAds(config={**SAMPLE_CONFIG, "attribution_window_days": 7}, catalog=catalog)
+    columns = tap.streams["ad_analytics"].columns
+    assert set(columns) == {"AD_ACCOUNT_ID", "AD_ID", "CTR", "IMPRESSION_1", "SPEND_IN_MICRO_DOLLAR"}
+
+
+def test_window_planner_covers_range():
+    planner = WindowPlanner(datetime.date(2020, 1, 1), datetime.date(2020, 12, 31))
+    windows = [planner.next_window()]
+    planner.shrink()
+    while windows[-1]:
+        windows.append(planner.next_window())
+    windows.pop()
+
+    assert windows[0] == DateWindow(datetime.date(2020, 1, 1), datetime.date(2020, 4, 10), datetime.date(2020, 12, 31))
+    assert windows[1].end - windows[1].start == datetime.timedelta(days=50)
+    assert windows[-1].end == datetime.date(2020, 12, 31)
+    for previous, window in zip(windows, windows[1:]):
+        assert window.start == previous.end + datetime.timedelta(days=1)
+
+
+def test_window_records_split_timeouts_and_checkpoint(monkeypatch):
+    config = {**SAMPLE_CONFIG, "analytics_window_workers": 3}
+    stream = TapPinterestAds(config=config).streams["account_analytics"]
+    last = datetime.date(2020, 12, 31)
+    monkeypatch.setattr(stream, "get_date_window", lambda context, token: DateWindow(datetime.date(2020, 1, 1), last, last))
+    monkeypatch.setattr(stream, "prepare_request", lambda context, window: window)
+
+    def request(window, context):
+        if window.end - window.start > datetime.timedelta(days=30):
+            raise requests.exceptions.ReadTimeout()
+        days = (window.end - window.start).days + 1
+        response = requests.Response()
+        response._content = json.dumps([
+            {"DATE": (window.start + datetime.timedelta(days=n)).isoformat()} for n in range(days)
+        ]).encode("utf-8")
+        return response
+
+    monkeypatch.setattr(stream, "_request", request)
+
+    items = list(stream.get_window_records({"ad_account_id": "123"}))
+
+    records = [item for item in items if not isinstance(item, Checkpoint)]
+    checkpoints = [item.replication_key_value for item in items if isinstance(item, Checkpoint)]
+    assert len(records) == 366
+    assert [r["DATE"] for r in records] == sorted(r["DATE"] for r in records)
+    assert checkpoints == sorted(checkpoints)
+    assert checkpoints[-1] == "2020-12-31T00:00:00Z"
+
+
+def test_window_is_not_split_after_server_error(monkeypatch):
+    stream = TapPinterestAds(config=SAMPLE_CONFIG).streams["account_analytics"]
+    monkeypatch.setattr(stream, "prepare_request", lambda context, window: window)
+    # Give up on retriable errors at once rather than backing off.
+    monkeypatch.setattr(stream, "request_decorator", lambda func: func)
+    requested = []
+
+    def request(window, context):
+        requested.append(window)
+        raise RetriableAPIError("500 Server Error")
+
+    monkeypatch.setattr(stream, "_request", request)
+    window = DateWindow(datetime.date(2020, 1, 1), datetime.date(2020, 1, 4), datetime.date(2020, 1, 4))
+    with pytest.raises(RetriableAPIError):
+        stream.request_window({"ad_account_id": "123"}, window)
+    assert requested == [window]
+
+
+def test_pool_fits_every_requesting_thread():
+    assert get_pool_size({}) == 10
+    assert get_pool_size({"http_pool_size": 2}) == 2
+    assert get_pool_size({"max_workers": 4, "analytics_window_workers": 3}) == 4 * 3 + 1
+    config = {"max_workers": 4, "analytics_window_workers": 3, "pipelined_sync": True}
+    assert get_pool_size(config) == 4 * 3 + 3 + 1
+
+
+def test_sparse_records_skip_empty_rows(capsys):
+    config = {**SAMPLE_CONFIG, "sparse_records": True, "skip_empty_records": True}
+    stream = TapPinterestAds(config=config).streams["ad_analytics"]
+    capsys.readouterr()
+    for record in (
+        {"AD_ID": "1", "DATE": "2022-01-01T00:00:00Z", "IMPRESSION_1": 0, "CTR": None},
+        {"AD_ID": "1", "DATE": "2022-01-02T00:00:00Z", "IMPRESSION_1": 3, "CTR": None},
+    ):
+        stream._write_record_message(record)
+
+    messages = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [m["record"] for m in messages] == [
+        {"AD_ID": "1", "DATE": "2022-01-02T00:00:00Z", "IMPRESSION_1": 3},
+    ]
+
+
+def test_change_cache_detects_changes(tmp_path, monkeypatch):
+    path = str(tmp_path / "changes.db")
+    cache = ChangeCache(path)
+    assert cache.is_changed("ads", "1", {"id": "1", "name": "a"})
+    assert cache.is_changed("ads", "2", {"id": "2", "name": "b"})
+    cache.commit()
+
+    cache = ChangeCache(path)
+    assert not cache.is_changed("ads", "1", {"name": "a", "id": "1"})
+    assert cache.is_changed("campaigns", "1", {"id": "1", "name": "a"})
+    cache.commit()
+
+    # Entity 2 was not seen in the last run and is evicted once expired.
+    monkeypatch.setattr(time, "time", lambda: real_time() + 86400 * 30 + 60)
+    cache = ChangeCache(path, retention_days=30)
+    cache.commit()
+    cache = ChangeCache(path)
+    assert cache.is_changed("ads", "2", {"id": "2", "name": "b"})
+
+
+def test_response_cache_expires_recent_analytics(tmp_path, monkeypatch):
+    stream = TapPinterestAds(config=SAMPLE_CONFIG).streams["account_analytics"]
+    cache = ResponseCache(str(tmp_path / "responses.db"), ttl_seconds=60)
+    login = stream.credentials_key
+
+    def analytics_request(end: datetime.date, **params: str) -> requests.PreparedRequest:
+        request = requests.Request("GET", "https://api.pinterest.com/v5/ad_accounts/1/analytics", params={
+            "end_date": end.isoformat(), **params,
+        }).prepare()
+        request.date_window = DateWindow(end, end, end)
+        return request
+
+    response = requests.Response()
+    response.status_code = 200
+    response._content = b'[{"DATE": "2022-01-01"}]'
+    old, recent = TODAY - datetime.timedelta(days=60), TODAY - datetime.timedelta(days=1)
+    for end in (old, recent):
+        request = analytics_request(end, granularity="DAY", columns="SPEND_IN_DOLLAR")
+        cache.put(request, login, response, immutable=stream.is_immutable_response(request))
+
+    # Parameters are matched regardless of their order.
+    cached = cache.get(analytics_request(recent, columns="SPEND_IN_DOLLAR", granularity="DAY"), login)
+    assert cached.json() == [{"DATE": "2022-01-01"}]
+    assert cache.get(analytics_request(recent, granularity="DAY"), login) is None
+    # Responses are never shared with another login, e.g. another shard of a sync.
+    other_login = TapPinterestAds(
+        config={**SAMPLE_CONFIG, "refresh_token": "other_refresh_token"}
+    ).streams["account_analytics"].credentials_key
+    assert other_login != login
+    assert cache.get(analytics_request(old, granularity="DAY", columns="SPEND_IN_DOLLAR"), other_login) is None
+
+    monkeypatch.setattr(time, "time", lambda: real_time() + 120)
+    assert cache.get(analytics_request(recent, granularity="DAY", columns="SPEND_IN_DOLLAR"), login) is None
+    assert cache.get(
+        analytics_request(recent, granularity="DAY", columns="SPEND_IN_DOLLAR"), login, ignore_expiry=True
+    ) is not None
+    cache.evict_expired()
+    assert cache.get(analytics_request(old, granularity="DAY", columns="SPEND_IN_DOLLAR"), login) is not None
+    assert cache.get(
+        analytics_request(recent, granularity="DAY", columns="SPEND_IN_DOLLAR"), login, ignore_expiry=True
+    ) is None
+
+
+def test_sync_progress_skips_completed_work():
+    tap = TapPinterestAds(config=SAMPLE_CONFIG)
+    stream = tap.streams["ad_analytics"]
+    stream.mark_completed({"ad_account_id": "123", "ad_ids": ["1", "2"]})
+    tap.streams["ads"].mark_completed({"ad_account_id": "123"})
+
+    # A sync restarted from the state skips the ads and accounts completed before.
+    tap = TapPinterestAds(config=SAMPLE_CONFIG, state=json.loads(json.dumps(tap.state)))
+    stream = tap.streams["ad_analytics"]
+    assert stream.is_completed({"ad_account_id": "123", "ad_id": "2", "ad_status": "ACTIVE"})
+    assert not stream.is_completed({"ad_account_id": "123", "ad_id": "3", "ad_status": "ACTIVE"})
+    assert tap.streams["ads"].is_completed({"ad_account_id": "123"})
+    assert not tap.streams["ads"].is_completed({"ad_account_id": "456"})
+
+    # Progress of an earlier day is dropped.
+    stream.stream_state["sync_progress"]["date"] = days_ago(1)
+    assert not stream.is_completed({"ad_account_id": "123", "ad_id": "2", "ad_status": "ACTIVE"})
+
+    stream.clear_sync_progress()
+    assert "sync_progress" not in stream.stream_state
+
+
+def test_analytics_lookback_moves_start_date_back():
+    config = {**SAMPLE_CONFIG, "start_date": "2020-01-01T00:00:00Z", "analytics_lookback_days": 3}
+    stream = TapPinterestAds(config=config).streams["account_analytics"]
+    context = {"ad_account_id": "123"}
+    stream.get_context_state(context).update(
+        {"replication_key": "DATE", "replication_key_value": f"{TODAY}T00:00:00Z"}
+    )
+    stream._write_starting_replication_value(context)
+    assert stream.get_start_date(context).date() == TODAY - datetime.timedelta(days=3)
+    assert stream.detect_changes
+
+    recent = (TODAY - datetime.timedelta(days=1)).isoformat()
+    config = {**config, "start_date": f"{recent}T00:00:00Z"}
+    stream = TapPinterestAds(config=config).streams["account_analytics"]
+    stream._write_starting_replication_value(context)
+    assert stream.get_start_date(context).date().isoformat() == recent
+    assert not TapPinterestAds(config=SAMPLE_CONFIG).streams["account_analytics"].detect_changes
@@ -0,0 +1,155 @@
+"""Tests full syncs against the local mock API."""
+
+import contextlib
+import datetime
+import io
+import json
+import sqlite3
+from typing import Any, Dict, List, Optional
+
+from tap_pinterest_ads.session import KeepAliveAdapter, SharedSession, get_pool_size
+from tap_pinterest_ads.tap import TapPinterestAds
+from tap_pinterest_ads.tests.benchmark import make_tap
+from tap_pinterest_ads.tests.mock_api import MockPinterestAPI
+
+YESTERDAY = (datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=1)).date()
+
+SAMPLE_CONFIG = {
+    "client_id": "client_id",
+    "client_secret": "client_secret",
+    "refresh_token": "refresh_token",
+    "start_date": (YESTERDAY - datetime.timedelta(days=2)).strftime("%Y-%m-%dT00:00:00Z"),
+}
+
+
+def sync(api: MockPinterestAPI, config: Dict[str, Any], state: Optional[dict] = None) -> List[dict]:
+    """Run a sync against the mock API and return its Singer messages."""
+    tap = make_tap(api, config, state)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        tap.sync_all()
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def get_records(messages: List[dict], stream: str) -> List[dict]:
+    return [
+        message["record"] for message in messages
+        if message["type"] == "RECORD" and message["stream"] == stream
+    ]
+
+
+def get_state(messages: List[dict]) -> dict:
+    return [message for message in messages if message["type"] == "STATE"][-1]["value"]
+
+
+def test_batched_ad_analytics_resume_from_ad_bookmarks():
+    config = {**SAMPLE_CONFIG, "ad_analytics_batch_size": 4}
+    with MockPinterestAPI(accounts=1, campaigns=1, ad_groups=1, ads=4) as api:
+        first = sync(api, config)
+        state = get_state(first)
+        second = sync(api, config, state)
+
+    bookmarks = {
+        partition["context"]["AD_ID"]: partition["replication_key_value"]
+        for partition in state["bookmarks"]["ad_analytics"]["partitions"]
+    }
+    assert bookmarks == {f"0-ads-{n}": f"{YESTERDAY}T00:00:00Z" for n in range(4)}
+    assert len(get_records(first, "ad_analytics")) == 4 * 3
+    # Bookmarks are inclusive, so only the last synced day is requested again.
+    assert {record["DATE"] for record in get_records(second, "ad_analytics")} == {f"{YESTERDAY}T00:00:00Z"}
+
+
+def without_signposts(state: Any) -> Any:
+    """Return the state without signposts, which hold the time of the sync."""
+    if isinstance(state, dict):
+        return {
+            key: without_signposts(value) for key, value in state.items()
+            if key != "replication_key_signpost"
+        }
+    if isinstance(state, list):
+        return [without_signposts(value) for value in state]
+    return state
+
+
+def test_concurrent_children_match_sequential_sync():
+    with MockPinterestAPI(accounts=3, campaigns=2, ad_groups=2, ads=4) as api:
+        sequential = sync(api, SAMPLE_CONFIG)
+        concurrent = sync(api, {**SAMPLE_CONFIG, "max_workers": 4})
+
+    # Parents are written before their children are fetched, so streams interleave differently.
+    for stream in ("ad_accounts", "campaigns", "ad_groups", "ads", "ad_analytics", "account_analytics"):
+        assert get_records(sequential, stream)
+        assert get_records(concurrent, stream) == get_records(sequential, stream)
+    assert without_signposts(get_state(concurrent)) == without_signposts(get_state(sequential))
+
+
+def without_timestamps(messages: List[dict]) -> List[dict]:
+    """Return the messages without the times they were extracted or synced at."""
+    return [
+        {key: without_signposts(value) for key, value in message.items() if key != "time_extracted"}
+        for message in messages
+    ]
+
+
+def test_pipelined_sync_matches_sequential_sync():
+    with MockPinterestAPI(accounts=2, campaigns=2, ad_groups=2, ads=4, latency=0.01) as api:
+        sequential = sync(api, SAMPLE_CONFIG)
+        pipelined = sync(api, {**SAMPLE_CONFIG, "pipelined_sync": True})
+
+    # Records are fetched ahead, but written in the same order, each STATE after the records it covers.
+    assert any(message["type"] == "RECORD" for message in sequential)
+    assert without_timestamps(pipelined) == without_timestamps(sequential)
+
+
+def test_streamed_analytics_match_parsed_analytics(tmp_path):
+    config = {
+        **SAMPLE_CONFIG,
+        "stream_analytics_responses": True,
+        "http_cache_path": str(tmp_path / "responses.db"),
+    }
+    with MockPinterestAPI(accounts=2, campaigns=1, ad_groups=1, ads=4) as api:
+        parsed = sync(api, SAMPLE_CONFIG)
+        paged = sync(api, config)
+        windowed = sync(api, {**config, "analytics_window_workers": 3})
+
+    for stream in ("ad_analytics", "ad_group_analytics", "campaign_analytics", "account_analytics"):
+        assert get_records(parsed, stream)
+        assert get_records(paged, stream) == get_records(parsed, stream)
+        assert get_records(windowed, stream) == get_records(parsed, stream)
+    # Entity listings are cached, streamed analytics are not.
+    keys = [key for key, in sqlite3.connect(tmp_path / "responses.db").execute("SELECT key FROM responses")]
+    assert any("/ads?" in key for key in keys)
+    assert not any("/analytics" in key for key in keys)
+
+
+def test_auth_and_streams_share_one_session_sized_for_workers(monkeypatch):
+    config = {**SAMPLE_CONFIG, "max_workers": 3, "analytics_window_workers": 2, "http_pool_size": 1}
+    sessions = []
+    send = SharedSession.send
+
+    def record_send(session, request, **kwargs):
+        sessions.append((session, request.method))
+        return send(session, request, **kwargs)
+
+    monkeypatch.setattr(SharedSession, "send", record_send)
+    with MockPinterestAPI(accounts=2, campaigns=1, ad_groups=1, ads=2) as api:
+        sync(api, config)
+
+    # The token is requested with a POST and records with GETs, all from one pool.
+    assert {method for _, method in sessions} == {"POST", "GET"}
+    assert len({id(session) for session, _ in sessions}) == 1
+    session = sessions[0][0]
+    assert isinstance(session.get_adapter(api.url_base), KeepAliveAdapter)
+    assert get_pool_size(config) == 3 * 2 + 1
+    assert session.get_adapter(api.url_base)._pool_maxsize == 3 * 2 + 1
+    # A tap configured for more workers gets a session with a larger pool.
+    larger = TapPinterestAds(config={**config, "max_workers": 6}).streams["ads"].requests_session
+    assert larger is not session
+    assert larger.get_adapter(api.url_base)._pool_maxsize == 6 * 2 + 1
+
+
+def test_session_without_keep_alive_closes_connections():
+    session = SharedSession(pool_size=2, keep_alive=False)
+    assert session.headers["Connection"] == "close"
+    assert not isinstance(session.get_adapter("https://api.pinterest.com/"), KeepAliveAdapter)
+    assert session is SharedSession(pool_size=2, keep_alive=False)
@@ -0,0 +1,90 @@
+"""Tests the on-disk cache of OAuth access tokens."""
+
+import json
+import multiprocessing
+import os
+import stat
+import time
+
+from tap_pinterest_ads.tests.benchmark import make_tap
+from tap_pinterest_ads.tests.mock_api import MockPinterestAPI
+from tap_pinterest_ads.tokencache import EXPIRY_MARGIN, TokenCache
+
+SAMPLE_CONFIG = {
+    "client_id": "client_id",
+    "client_secret": "client_secret",
+    "refresh_token": "refresh_token",
+}
+
+
+def test_cached_token_is_fresh_until_its_margin(tmp_path):
+    cache = TokenCache(str(tmp_path / "tokens.json"))
+    key = cache.get_key("client_id", "refresh_token")
+    assert "refresh_token" not in key
+    cache.set(key, "token", 3600)
+    access_token, seconds_left = cache.get(key)
+    assert access_token == "token"
+    assert 3600 - EXPIRY_MARGIN - 5 < seconds_left <= 3600 - EXPIRY_MARGIN
+
+    cache.set(key, "expiring", EXPIRY_MARGIN)
+    assert cache.get(key) is None
+    # Writes replace the file atomically, leaving no temporary files behind.
+    assert os.listdir(tmp_path) == ["tokens.json"]
+    assert stat.S_IMODE(os.stat(tmp_path / "tokens.json").st_mode) == 0o600
+
+
+def test_expired_entries_are_dropped(tmp_path):
+    cache = TokenCache(str(tmp_path / "tokens.json"))
+    cache.set("expired", "old", -1)
+    cache.set("fresh", "new", 3600)
+    assert set(json.loads((tmp_path / "tokens.json").read_text())) == {"fresh"}
+
+
+def test_authenticator_reuses_and_refreshes_cached_token(tmp_path):
+    config = {**SAMPLE_CONFIG, "token_cache_path": str(tmp_path / "tokens.json")}
+    with MockPinterestAPI(accounts=1) as api:
+        authenticator = next(iter(make_tap(api, config).streams.values())).authenticator
+        authenticator.ensure_valid_token()
+        assert api.token_requests == 1
+
+        # Another run finds the token in the cache.
+        authenticator.access_token = None
+        authenticator.last_refreshed = None
+        authenticator.ensure_valid_token()
+        assert api.token_requests == 1
+        assert authenticator.access_token == "access_token"
+
+        # Once expired, the token is refreshed and stored again.
+        cache_file = tmp_path / "tokens.json"
+        entries = json.loads(cache_file.read_text())
+        for entry in entries.values():
+            entry["expires_at"] = time.time()
+        cache_file.write_text(json.dumps(entries))
+        authenticator.access_token = None
+        authenticator.last_refreshed = None
+        authenticator.ensure_valid_token()
+        assert api.token_requests == 2
+        expires_at = next(iter(json.loads(cache_file.read_text()).values()))["expires_at"]
+        assert expires_at > time.time() + EXPIRY_MARGIN
+
+
+def write_tokens(path: str, writer: int, count: int) -> None:
+    cache = TokenCache(path)
+    for n in range(count):
+        with cache.locked():
+            cache.set(f"{writer}-{n}", "token", 3600)
+
+
+def test_concurrent_writers_keep_every_token(tmp_path):
+    path = str(tmp_path / "tokens.json")
+    context = multiprocessing.get_context()
+    processes = [
+        context.Process(target=write_tokens, args=(path, writer, 20)) for writer in range(4)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    assert [process.exitcode for process in processes] == [0] * 4
+    assert len(json.loads(open(path).read())) == 4 * 20
@@ -0,0 +1,81 @@
+"""On-disk cache of OAuth access tokens shared by concurrent tap processes."""
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to unlocked access
+    fcntl = None  # type: ignore
+
+EXPIRY_MARGIN = 60  # Seconds before expiry at which a cached token is stale
+
+
+class TokenCache:
+    """JSON file of access tokens keyed by a hash of the OAuth credentials.
+
+    Access goes through an exclusive lock on a sibling `.lock` file, so that
+    across processes only one refreshes an expired token while the others
+    wait and then reuse it.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = os.path.expanduser(path)
+        self.lock_path = self.path + ".lock"
+
+    @staticmethod
+    def get_key(client_id: str, refresh_token: str) -> str:
+        """Return the cache key, without storing the refresh token itself."""
+        return hashlib.sha256(f"{client_id}:{refresh_token}".encode("utf-8")).hexdigest()
+
+    @contextlib.contextmanager
+    def locked(self) -> Iterator[None]:
+        """Hold the cache lock for the duration of the block."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.lock_path, "a") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_all(self) -> dict:
+        try:
+            with open(self.path) as cache_file:
+                return json.load(cache_file)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        """Return a cached `(access_token, seconds_left)` if it is still fresh."""
+        entry = self._read_all().get(key)
+        if not entry:
+            return None
+        seconds_left = entry["expires_at"] - time.time() - EXPIRY_MARGIN
+        if seconds_left <= 0:
+            return None
+        return entry["access_token"], seconds_left
+
+    def set(self, key: str, access_token: str, expires_in: float) -> None:
+        """Store a token, dropping any entries that have expired."""
+        now = time.time()
+        entries = {
+            k: v for k, v in self._read_all().items() if v.get("expires_at", 0) > now
+        }
+        entries[key] = {"access_token": access_token, "expires_at": now + expires_in}
+        directory = os.path.dirname(self.path) or "."
+        # mkstemp creates the file readable by the current user only.
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tokens-")
+        try:
+            with os.fdopen(fd, "w") as tmp_file:
+                json.dump(entries, tmp_file)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
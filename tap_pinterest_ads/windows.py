@@ -0,0 +1,50 @@
+"""Date windows requested by the analytics streams."""
+import datetime
+from typing import NamedTuple, Optional, Tuple
+
+MAX_WINDOW_DAYS = 100  # Days a window may extend past its start date
+MAX_WINDOW_ROWS = 50000  # Rows in a response above which windows are shrunk
+
+
+class DateWindow(NamedTuple):
+    """Inclusive range of dates requested by one page of an analytics stream."""
+
+    start: datetime.date
+    end: datetime.date
+    last: datetime.date  # Final date of the whole sync
+
+    def split(self) -> Tuple["DateWindow", "DateWindow"]:
+        """Return the two halves of a window spanning more than one day."""
+        middle = self.start + (self.end - self.start) // 2
+        return (
+            DateWindow(self.start, middle, self.last),
+            DateWindow(middle + datetime.timedelta(days=1), self.end, self.last),
+        )
+
+
+class WindowPlanner:
+    """Hands out the consecutive windows covering a date range.
+
+    Windows are planned one at a time, so that once a response turns out to
+    be large, the windows requested after it are made smaller.
+    """
+
+    def __init__(
+        self, start: datetime.date, last: datetime.date, days: int = MAX_WINDOW_DAYS
+    ) -> None:
+        self.start = start
+        self.last = last
+        self.days = days
+
+    def next_window(self) -> Optional[DateWindow]:
+        """Return the next window, or None once the range is covered."""
+        if self.start > self.last:
+            return None
+        end = min(self.start + datetime.timedelta(days=self.days), self.last)
+        window = DateWindow(self.start, end, self.last)
+        self.start = end + datetime.timedelta(days=1)
+        return window
+
+    def shrink(self) -> None:
+        """Halve the span of the windows planned from now on."""
+        self.days //= 2